@@ -0,0 +1,264 @@
+# Async HTTP API for portfolio generation, forecasting, backtests and benchmarks.
+# Run with: uvicorn api:app
+import asyncio
+import json
+import os
+import time
+from typing import Literal
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+PROCESS_WORKERS = int(os.getenv("API_PROCESS_WORKERS", os.cpu_count() or 2))
+MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", 64))  # CPU jobs in flight across all requests
+RESULT_TTL = float(os.getenv("API_RESULT_TTL", 300))  # Seconds a finished result is served from memory
+MAX_RESULTS = int(os.getenv("API_MAX_RESULTS", 10000))
+BATCH_WINDOW = float(os.getenv("API_BATCH_WINDOW", 0.01))  # Seconds forecast requests wait to be batched
+
+
+# --- CPU-bound jobs (run inside the process pool) ---
+
+def _init_worker():
+    # The API pool already spreads jobs across CPUs; nested order-search pools would oversubscribe them
+    import arima_orders
+    arima_orders.SEARCH_WORKERS = 1
+
+def _portfolio_job(params, prices, risk_prices):
+    from portfolio import generate_portfolio
+    if prices.empty:
+        return []
+    return generate_portfolio(**params, prices=prices, risk_prices=risk_prices).to_dict(orient="records")
+
+def _forecast_job(tickers, forecast_periods, model_type, prices):
+    from forecasting import forecast_stock_prices
+    if prices.empty:
+        return {}
+    return {t: float(r) for t, r in forecast_stock_prices(prices, forecast_periods, model_type).items()}
+
+def _backtest_job(records, start, end, prices, sp500):
+    from backtesting import compute_backtest_growth
+    from panel import PricePanel
+    growth = compute_backtest_growth(pd.DataFrame(records), start=start, end=end,
+                                     panel=PricePanel.from_frame(prices), sp500_panel=PricePanel.from_frame(sp500))
+    return [{"Date": d.isoformat(), **{k: (None if pd.isna(v) else float(v)) for k, v in row.items()}}
+            for d, row in growth.iterrows()]
+
+def _benchmark_job(records, start, end, benchmarks):
+    from backtesting import benchmark_against_indices
+    from panel import PricePanel
+    return benchmark_against_indices(pd.DataFrame(records), start=start, end=end,
+                                     benchmark_panel=PricePanel.from_frame(benchmarks)).to_dict(orient="records")
+
+def _risk_job(portfolios, period, prices, benchmarks):
+    from panel import PricePanel
+    from risk import portfolio_returns, risk_report
+    weights = pd.DataFrame([{row["Ticker"]: row["Allocation"] for row in records} for records in portfolios]).fillna(0)
+    panel = PricePanel.from_frame(prices)
+    benchmark_panel = PricePanel.from_frame(benchmarks)
+    report = risk_report(portfolio_returns(panel, weights), benchmark_panel.returns if not benchmark_panel.empty else None)
+    return json.loads(report.reset_index(drop=True).to_json(orient="records", date_format="iso"))
+
+
+# --- Market data (fetched in the API process) ---
+# Downloads go through this process's shared scheduler and price store, so the rate cap and
+# in-flight coalescing hold across all requests; the pool workers only receive the arrays.
+
+def _fetch_prices(tickers, **window):
+    """Closing prices from the shared price store (an empty frame when no data)."""
+    import db
+    panel = db.fetch_price_panel(list(tickers), **window)
+    return panel.prices if panel is not None else pd.DataFrame()
+
+def _fetch_benchmarks(**window):
+    """Benchmark index prices with columns named after the indices."""
+    from backtesting import BENCHMARK_INDICES
+    names = {ticker: name for name, ticker in BENCHMARK_INDICES.items()}
+    return _fetch_prices(BENCHMARK_INDICES.values(), **window).rename(columns=names)
+
+async def _portfolio_data(params):
+    from portfolio import get_stocks_from_selected_sectors
+    tickers = get_stocks_from_selected_sectors(params["selected_sectors"])
+    prices, risk_prices = await asyncio.gather(
+        asyncio.to_thread(_fetch_prices, tickers, period="3y", interval="1wk"),
+        asyncio.to_thread(_fetch_prices, tickers, period="3y", interval="1d")
+    )
+    return prices, risk_prices
+
+async def _forecast_data(tickers):
+    return (await asyncio.to_thread(_fetch_prices, tickers, period="3y", interval="1wk"),)
+
+async def _backtest_data(records, start, end):
+    tickers = [row["Ticker"] for row in records]
+    return await asyncio.gather(
+        asyncio.to_thread(_fetch_prices, tickers, start=start, end=end, interval="1wk"),
+        asyncio.to_thread(_fetch_prices, ["^GSPC"], start=start, end=end, interval="1wk")
+    )
+
+async def _benchmark_data(start, end):
+    return (await asyncio.to_thread(_fetch_benchmarks, start=start, end=end, interval="1wk"),)
+
+async def _risk_data(portfolios, period):
+    tickers = sorted({row["Ticker"] for records in portfolios for row in records})
+    return await asyncio.gather(
+        asyncio.to_thread(_fetch_prices, tickers, period=period, interval="1wk"),
+        asyncio.to_thread(_fetch_benchmarks, period=period, interval="1wk")
+    )
+
+
+# --- Request models ---
+
+class PortfolioRequest(BaseModel):
+    investment_amount: float
+    risk_tolerance: Literal["Low", "Medium", "High"] = "Medium"
+    selected_sectors: list[str] = []
+    use_forecast: bool = True
+    allocation_method: Literal["mean_variance", "hrp"] | None = None
+
+class ForecastRequest(BaseModel):
+    tickers: list[str]
+    forecast_periods: int = 12
+    model_type: Literal["ARIMA", "LSTM"] = "ARIMA"
+
+class BacktestRequest(BaseModel):
+    portfolio: list[dict]
+    start: str = "2015-01-01"
+    end: str = "2020-01-01"
+
+class RiskRequest(BaseModel):
+    portfolios: list[list[dict]]
+    period: str = "3y"
+
+
+# --- Scheduling: bounded concurrency, coalescing and batching ---
+
+class JobRunner:
+    """Runs CPU-bound jobs in a process pool with bounded concurrency and request coalescing.
+
+    Identical requests in flight share one job, and finished results are served from
+    memory for RESULT_TTL seconds, so hot requests never reach the pool. A job's market data
+    comes from ``fetch``, a coroutine run in this process whose results are appended to the
+    job's arguments, so only the arrays cross into the pool.
+    """
+
+    def __init__(self, pool, max_concurrency):
+        self.pool = pool
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = {}
+        self.results = {}
+
+    async def run(self, key, fn, *args, fetch=None):
+        cached = self.results.get(key)
+        if cached and time.monotonic() - cached[0] < RESULT_TTL:
+            return cached[1]
+
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute(key, fn, args, fetch))
+            self.in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _execute(self, key, fn, args, fetch):
+        try:
+            if fetch is not None:
+                args = args + tuple(await fetch())
+            async with self.semaphore:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.pool, fn, *args)
+            now = time.monotonic()
+            if len(self.results) >= MAX_RESULTS:
+                self.results = {k: v for k, v in self.results.items() if now - v[0] < RESULT_TTL}
+            self.results[key] = (now, result)
+            return result
+        finally:
+            self.in_flight.pop(key, None)
+
+
+class ForecastBatcher:
+    """Collects forecast requests for BATCH_WINDOW seconds and runs one job for the union of tickers."""
+
+    def __init__(self, runner):
+        self.runner = runner
+        self.pending = {}
+
+    async def forecast(self, tickers, forecast_periods, model_type):
+        group = (forecast_periods, model_type)
+        batch = self.pending.get(group)
+        if batch is None:
+            batch = {"tickers": set(), "future": asyncio.get_running_loop().create_future()}
+            self.pending[group] = batch
+            asyncio.get_running_loop().call_later(BATCH_WINDOW, self._flush, group)
+        batch["tickers"].update(tickers)
+        results = await asyncio.shield(batch["future"])
+        return {t: results.get(t) for t in tickers}
+
+    def _flush(self, group):
+        batch = self.pending.pop(group)
+        tickers = tuple(sorted(batch["tickers"]))
+        task = asyncio.ensure_future(self.runner.run(("forecast", tickers) + group, _forecast_job, tickers, *group,
+                                                     fetch=lambda: _forecast_data(tickers)))
+
+        def deliver(done):
+            if done.exception():
+                batch["future"].set_exception(done.exception())
+            else:
+                batch["future"].set_result(done.result())
+        task.add_done_callback(deliver)
+
+
+def _stream_json(records):
+    """Streams a JSON array one record at a time."""
+    yield "["
+    for i, record in enumerate(records):
+        yield ("," if i else "") + json.dumps(record, default=str)
+    yield "]"
+
+
+# --- App ---
+
+@asynccontextmanager
+async def lifespan(app):
+    pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS, initializer=_init_worker)
+    app.state.runner = JobRunner(pool, MAX_CONCURRENCY)
+    app.state.batcher = ForecastBatcher(app.state.runner)
+    yield
+    pool.shutdown(cancel_futures=True)
+
+app = FastAPI(title="AI-Powered Portfolio Generator API", lifespan=lifespan)
+
+
+@app.post("/portfolio")
+async def portfolio_endpoint(request: PortfolioRequest):
+    params = request.model_dump()
+    params["selected_sectors"] = sorted(params["selected_sectors"])
+    key = ("portfolio", json.dumps(params, sort_keys=True))
+    records = await app.state.runner.run(key, _portfolio_job, params, fetch=lambda: _portfolio_data(params))
+    return StreamingResponse(_stream_json(records), media_type="application/json")
+
+@app.post("/forecast")
+async def forecast_endpoint(request: ForecastRequest):
+    return await app.state.batcher.forecast(sorted(set(request.tickers)), request.forecast_periods, request.model_type)
+
+@app.post("/backtest")
+async def backtest_endpoint(request: BacktestRequest):
+    key = ("backtest", json.dumps(request.portfolio, sort_keys=True), request.start, request.end)
+    records = await app.state.runner.run(key, _backtest_job, request.portfolio, request.start, request.end,
+                                         fetch=lambda: _backtest_data(request.portfolio, request.start, request.end))
+    return StreamingResponse(_stream_json(records), media_type="application/json")
+
+@app.post("/benchmark")
+async def benchmark_endpoint(request: BacktestRequest):
+    key = ("benchmark", json.dumps(request.portfolio, sort_keys=True), request.start, request.end)
+    records = await app.state.runner.run(key, _benchmark_job, request.portfolio, request.start, request.end,
+                                         fetch=lambda: _benchmark_data(request.start, request.end))
+    return StreamingResponse(_stream_json(records), media_type="application/json")
+
+@app.post("/risk")
+async def risk_endpoint(request: RiskRequest):
+    key = ("risk", json.dumps(request.portfolios, sort_keys=True), request.period)
+    records = await app.state.runner.run(key, _risk_job, request.portfolios, request.period,
+                                         fetch=lambda: _risk_data(request.portfolios, request.period))
+    return StreamingResponse(_stream_json(records), media_type="application/json")
@@ -0,0 +1,130 @@
+import os
+import atexit
+import threading
+import multiprocessing
+import warnings
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from statsmodels.tsa.arima.model import ARIMA
+
+DEFAULT_ORDER = (5, 1, 0)
+ORDER_CANDIDATES = [(p, 1, q) for p in range(0, 6) for q in range(0, 3)]
+
+# Processes for order searches when the caller gives none; every Streamlit/API process gets its own pool
+SEARCH_WORKERS = int(os.getenv("ARIMA_SEARCH_WORKERS", min(4, os.cpu_count() or 1)))
+
+# ticker -> {"order", "length", "std"}; reused until the series changes materially
+_ORDER_CACHE = {}
+
+
+_POOL = None
+_POOL_WORKERS = None
+_POOL_LOCK = threading.Lock()
+
+
+def _fit_criterion(task):
+    """Fits one (ticker, order) candidate and returns its information criterion and parameters (inf/None on failure)."""
+    ticker, values, order, criterion, maxiter = task
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            result = ARIMA(values, order=order).fit(method_kwargs={"maxiter": maxiter})
+        return ticker, order, float(getattr(result, criterion)), np.asarray(result.params)
+    except Exception:
+        return ticker, order, np.inf, None
+
+
+def _get_pool(n_workers):
+    """Process pool reused across searches (rebuilt only when the requested size changes).
+
+    Workers are started from a fork server (spawned where that is unavailable): forking the
+    multi-threaded Streamlit server directly can copy a held lock into the child and deadlock.
+    """
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != n_workers:
+            if _POOL is not None:
+                _POOL.shutdown()
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _POOL = ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context(method))
+            _POOL_WORKERS = n_workers
+        return _POOL
+
+
+@atexit.register
+def _shutdown_pool():
+    if _POOL is not None:
+        _POOL.shutdown(cancel_futures=True)
+
+
+def _run(tasks, pool):
+    return list(pool.map(_fit_criterion, tasks, chunksize=4)) if pool else [_fit_criterion(t) for t in tasks]
+
+
+def _needs_search(ticker, values, tolerance):
+    """True when no order is cached for the ticker or its history has grown/shifted beyond the tolerance."""
+    cached = _ORDER_CACHE.get(ticker)
+    if cached is None:
+        return True
+    grown = len(values) > cached["length"] * (1 + tolerance) or len(values) < cached["length"]
+    shifted = abs(np.std(values) - cached["std"]) > tolerance * cached["std"]
+    return grown or shifted
+
+
+def select_arima_orders(series_by_ticker, candidates=ORDER_CANDIDATES, criterion="aic", keep=3,
+                        cheap_window=104, cheap_maxiter=25, n_workers=None, refresh_tolerance=0.1,
+                        return_params=False):
+    """Chooses an ARIMA (p,d,q) order per ticker, searching all tickers and candidates in parallel.
+
+    Every candidate is first fit cheaply on the most recent ``cheap_window`` observations with a
+    capped optimizer; only the ``keep`` best per ticker by ``criterion`` are refit on the full
+    history. Chosen orders are cached and reused until the ticker's series changes materially.
+    With ``return_params=True`` also returns the winning full-history parameters of the tickers
+    searched in this call, so callers can filter with them instead of fitting again.
+    """
+    orders = {}
+    params = {}
+    pending = {}
+    for ticker, prices in series_by_ticker.items():
+        values = np.asarray(prices, dtype=float)
+        if _needs_search(ticker, values, refresh_tolerance):
+            pending[ticker] = values
+        else:
+            orders[ticker] = _ORDER_CACHE[ticker]["order"]
+
+    if not pending:
+        return (orders, params) if return_params else orders
+
+    n_workers = SEARCH_WORKERS if n_workers is None else n_workers
+    pool = _get_pool(n_workers) if n_workers != 1 else None
+
+    # Stage 1: cheap fits on a short window for every (ticker, order) pair
+    cheap_tasks = [
+        (ticker, values[-cheap_window:], order, criterion, cheap_maxiter)
+        for ticker, values in pending.items()
+        for order in candidates
+    ]
+    scores = {}
+    for ticker, order, score, _ in _run(cheap_tasks, pool):
+        scores.setdefault(ticker, []).append((score, order))
+
+    # Stage 2: full-history fits for the survivors only
+    full_tasks = [
+        (ticker, pending[ticker], order, criterion, 50)
+        for ticker, ranked in scores.items()
+        for score, order in sorted(ranked)[:keep]
+        if np.isfinite(score)
+    ]
+    best = {}
+    for ticker, order, score, fitted in _run(full_tasks, pool):
+        if score < best.get(ticker, (np.inf, None, None))[0]:
+            best[ticker] = (score, order, fitted)
+
+    for ticker, values in pending.items():
+        _, order, fitted = best.get(ticker, (np.inf, DEFAULT_ORDER, None))
+        _ORDER_CACHE[ticker] = {"order": order, "length": len(values), "std": float(np.std(values))}
+        orders[ticker] = order
+        if fitted is not None:
+            params[ticker] = fitted
+
+    return (orders, params) if return_params else orders
@@ -0,0 +1,106 @@
+import warnings
+import threading
+import numpy as np
+from collections import deque
+from statsmodels.tsa.arima.model import ARIMA
+
+REFIT_EVERY = 13  # Bars between full re-estimations (a quarter of weekly data)
+DRIFT_WINDOW = 13  # Recent one-step residuals watched for drift
+DRIFT_THRESHOLD = 2.0  # RMS of standardized residuals that forces a refit (≈1.0 when the model fits)
+
+# ticker -> fitted state-space results plus bookkeeping for incremental updates
+_MODEL_STATE = {}
+_STATE_LOCK = threading.Lock()
+
+
+def _fit(values, order):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return ARIMA(values, order=order).fit()
+
+
+def _new_bars(state, history, check_bars=5):
+    """Bars of ``history`` after the last one the stored model was filtered over, or None when they disagree.
+
+    Matching is by date over the overlap, so a rolling window whose oldest bars roll off still
+    lines up with the stored state as long as the bars it shares with it are unchanged.
+    """
+    position = history.index.get_indexer([state["last_date"]])[0]
+    if position < 0:
+        return None
+    overlap = history.iloc[max(position + 1 - check_bars, 0):position + 1].to_numpy(dtype=float)
+    if not np.allclose(overlap, state["tail"][-len(overlap):], rtol=1e-6, atol=0.0):
+        return None
+    return history.to_numpy(dtype=float)[position + 1:]
+
+
+def _filter(values, order, params):
+    """Results for known parameters: runs the Kalman filter only, no optimization."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return ARIMA(values, order=order).filter(params)
+
+
+def _residuals_drifted(residuals, threshold):
+    return len(residuals) > 0 and np.sqrt(np.nanmean(np.square(residuals))) > threshold
+
+
+def incremental_arima_forecast(ticker, prices, order, forecast_periods=12, refit_every=REFIT_EVERY,
+                               drift_threshold=DRIFT_THRESHOLD, params=None):
+    """Forecast with a per-ticker ARIMA kept in memory, filtering new bars instead of refitting.
+
+    The last bar is treated as provisional (a live weekly view's current week keeps changing):
+    the stored model covers completed bars only, and the last bar is filtered into a throwaway
+    copy just for the forecast. New completed bars are appended to the stored state-space results
+    with the existing parameters (only the Kalman filter runs over them). Parameters are
+    re-estimated only every ``refit_every`` bars, when the RMS of recent standardized residuals
+    exceeds ``drift_threshold``, or when the order or the overlapping history has changed. Pass
+    ``params`` just estimated on this history (e.g. by the order search) to filter with them
+    instead of re-estimating when a fit is due.
+    """
+    completed, provisional = prices.iloc[:-1], prices.to_numpy(dtype=float)[-1:]
+    with _STATE_LOCK:
+        state = _MODEL_STATE.get(ticker)
+    result = None
+
+    new_values = _new_bars(state, completed) if state and state["order"] == order else None
+    if new_values is not None:
+        result = state["result"]
+        bars_since_refit = state["bars_since_refit"]
+        # Stored states are shared by every session forecasting this ticker, so update a copy
+        residuals = deque(state["residuals"], maxlen=DRIFT_WINDOW)
+
+        if len(new_values):
+            result = result.extend(new_values)
+            bars_since_refit += len(new_values)
+            residuals.extend(result.filter_results.standardized_forecasts_error[0])
+            if bars_since_refit >= refit_every or _residuals_drifted(residuals, drift_threshold):
+                result = None
+
+    if result is None:
+        values = completed.to_numpy(dtype=float)
+        result = _fit(values, order) if params is None else _filter(values, order, params)
+        bars_since_refit = 0
+        residuals = deque(maxlen=DRIFT_WINDOW)
+
+    with _STATE_LOCK:
+        _MODEL_STATE[ticker] = {
+            "result": result,
+            "order": order,
+            "last_date": completed.index[-1],
+            "tail": completed.to_numpy(dtype=float)[-5:],
+            "bars_since_refit": bars_since_refit,
+            "residuals": residuals
+        }
+
+    forecast = result.extend(provisional).forecast(steps=forecast_periods)
+    return float(forecast[-1])
+
+
+def reset_arima_state(ticker=None):
+    """Drops stored models so the next forecast refits (one ticker, or all when ticker is None)."""
+    with _STATE_LOCK:
+        if ticker is None:
+            _MODEL_STATE.clear()
+        else:
+            _MODEL_STATE.pop(ticker, None)
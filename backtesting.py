@@ -1,36 +1,60 @@
-import yfinance as yf
 import pandas as pd
-from forecasting import fetch_stock_data, forecast_stock_prices
-from portfolio import generate_portfolio
+from portfolio import generate_portfolio, get_stocks_from_selected_sectors
+from snapshots import load_snapshot
+from panel import PricePanel
+import db
 
-def generate_backtest_portfolio(investment_amount, risk_tolerance, selected_sectors):
-    """Creates a backtest portfolio using only 2010-2015 data."""
-    return generate_portfolio(investment_amount, risk_tolerance, selected_sectors, use_forecast=True)
+BENCHMARK_INDICES = {
+    "S&P 500": "^GSPC",
+    "Nasdaq-100": "^NDX",
+    "Russell 2000": "^RUT"
+}
+
+def generate_backtest_portfolio(investment_amount, risk_tolerance, selected_sectors, start="2010-01-01", as_of="2015-01-01",
+                                version=None, refresh=False):
+    """Creates a backtest portfolio using only 2010-2015 data.
+
+    Pass the ``version`` recorded in a previous result's ``attrs["snapshot_version"]`` to rerun
+    on exactly the same prices; ``refresh`` commits the latest download as a new version first.
+    """
+    tickers = get_stocks_from_selected_sectors(selected_sectors)
+    store = load_snapshot(tickers, start=start, interval="1d", refresh=refresh)
+    version = store.latest_version if version is None else version
+
+    # Point-in-time views: the optimizer only sees bars up to the as-of date, weekly bars resampled from the same version
+    daily = store.as_of(as_of, version)
+    weekly = db.resample_prices(daily.prices, "1wk")
+    portfolio = generate_portfolio(investment_amount, risk_tolerance, selected_sectors, use_forecast=True,
+                                   prices=weekly, risk_prices=daily)
+    portfolio.attrs["snapshot_version"] = version
+    return portfolio
 
 import matplotlib.pyplot as plt
 
-def evaluate_backtest_performance(portfolio_df):
-    """Compare AI portfolio performance against S&P 500 (2015-2020)."""
+def compute_backtest_growth(portfolio_df, start="2015-01-01", end="2020-01-01", panel=None, sp500_panel=None):
+    """Normalized growth of the AI portfolio and the S&P 500 over the backtest window."""
     tickers = portfolio_df["Ticker"].tolist()
-    
-    # Fetch actual performance (2015-2020)
-    historical_data = fetch_stock_data(tickers, start="2015-01-01", end="2020-01-01")
-    
-    # Ensure tickers in data match portfolio tickers
-    portfolio_tickers = portfolio_df["Ticker"].tolist()
-    historical_data = historical_data[portfolio_tickers].dropna(axis=1, how="all")  
-
-    # Normalize stock data
-    normalized_prices = historical_data / historical_data.iloc[0]  
-
-    # Compute weighted portfolio return
+
+    # Fetch actual performance unless the caller already holds the panel
+    if panel is None:
+        panel = PricePanel.from_frame(db.fetch_stock_data(tickers, start=start, end=end))
+
+    # Compute weighted portfolio return from the panel's normalized prices
     weights = portfolio_df.set_index("Ticker")["Allocation"]
-    weights = weights.reindex(normalized_prices.columns).fillna(0)  
-    portfolio_returns = (normalized_prices * weights).sum(axis=1)  
+    portfolio_returns = panel.select(tickers).weighted_growth(weights)
 
     # Fetch actual S&P 500 performance
-    sp500_data = yf.download("^GSPC", start="2015-01-01", end="2020-01-01")["Close"]
-    sp500_growth = sp500_data / sp500_data.iloc[0]  
+    if sp500_panel is None:
+        sp500_panel = PricePanel.from_frame(db.fetch_stock_data("^GSPC", start=start, end=end))
+    sp500_growth = PricePanel.from_frame(sp500_panel).normalized.iloc[:, 0]
+
+    return pd.DataFrame({"AI Portfolio": portfolio_returns, "S&P 500": sp500_growth})
+
+def evaluate_backtest_performance(portfolio_df, panel=None):
+    """Compare AI portfolio performance against S&P 500 (2015-2020)."""
+    growth = compute_backtest_growth(portfolio_df, panel=panel)
+    portfolio_returns = growth["AI Portfolio"].dropna()
+    sp500_growth = growth["S&P 500"].dropna()
 
     # Plot AI Portfolio vs. S&P 500
     plt.figure(figsize=(10,5))
@@ -44,17 +68,13 @@ def evaluate_backtest_performance(portfolio_df):
     plt.show()
 
 
-def benchmark_against_indices(portfolio_df, start="2015-01-01", end="2020-01-01"):
+def benchmark_against_indices(portfolio_df, start="2015-01-01", end="2020-01-01", benchmark_panel=None):
     """Compare AI portfolio returns against S&P 500, Nasdaq-100, and Russell 2000."""
-    indices = {
-        "S&P 500": "^GSPC",
-        "Nasdaq-100": "^NDX",
-        "Russell 2000": "^RUT"
-    }
-    
     try:
-        for index_name, ticker in indices.items():
-            index_data = yf.download(ticker, start=start, end=end, interval="1wk")["Close"]
+        if benchmark_panel is None:
+            benchmark_panel = fetch_benchmark_panel(start=start, end=end)
+        for index_name in BENCHMARK_INDICES:
+            index_data = benchmark_panel.prices[index_name].dropna()
             index_return = (index_data.iloc[-1] - index_data.iloc[0]) / index_data.iloc[0]
             portfolio_df[f"{index_name} Return (%)"] = index_return * 100
 
@@ -63,3 +83,8 @@ def benchmark_against_indices(portfolio_df, start="2015-01-01", end="2020-01-01"
         print(f"⚠️ Error fetching benchmark data: {e}")
         return portfolio_df
 
+def fetch_benchmark_panel(period="3y", interval="1wk", start=None, end=None):
+    """Benchmark index prices as a PricePanel with columns named after the indices."""
+    data = db.fetch_stock_data(list(BENCHMARK_INDICES.values()), period=period, interval=interval, start=start, end=end)
+    names = {ticker: name for name, ticker in BENCHMARK_INDICES.items()}
+    return PricePanel.from_frame(data.rename(columns=names))
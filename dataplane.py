@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import pandas as pd
+import db
+from panel import PricePanel
+
+SHARED_BUDGET_MB = float(os.getenv("SHARED_DATA_BUDGET_MB", 128))
+HOLD_TTL = 30 * 60  # Seconds a session's pin survives without being renewed (sessions end silently)
+INFO_TTL = 15 * 60  # Seconds live ticker info is shared before it is refetched
+
+
+def _nbytes(value):
+    """Approximate bytes held by a shared value."""
+    if isinstance(value, PricePanel):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return db.frame_memory(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class DataPlane:
+    """Process-wide store of immutable values shared by every Streamlit session.
+
+    Values are keyed by what they were computed from (e.g. a forecast by its panel's data
+    version), so sessions asking for the same thing get the same object and concurrent misses
+    share one load. Each session pins the values it is showing through named slots; pinned
+    values are never evicted, unpinned ones are evicted least recently used once the store
+    is over its size budget. Hits, misses and evictions are counted for the hit rate.
+    """
+
+    def __init__(self, budget_mb=SHARED_BUDGET_MB, hold_ttl=HOLD_TTL):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.hold_ttl = hold_ttl
+        self.nbytes = 0
+        self._entries = OrderedDict()  # key -> {"value", "nbytes", "refs"}
+        self._holders = {}  # (session, slot) -> (key, last renewed)
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def _pin(self, holder, key):
+        """Points a session slot at ``key``, releasing whatever the slot held before."""
+        previous = self._holders.get(holder)
+        if previous is not None and previous[0] != key and previous[0] in self._entries:
+            self._entries[previous[0]]["refs"] -= 1
+        if previous is None or previous[0] != key:
+            self._entries[key]["refs"] += 1
+        self._holders[holder] = (key, time.monotonic())
+
+    def _expire_holders(self):
+        now = time.monotonic()
+        for holder, (key, renewed) in list(self._holders.items()):
+            if now - renewed > self.hold_ttl:
+                del self._holders[holder]
+                if key in self._entries:
+                    self._entries[key]["refs"] -= 1
+
+    def _evict(self):
+        """Drops least recently used unpinned values until the store fits its budget."""
+        for key in list(self._entries):
+            if self.nbytes <= self.budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry["refs"] <= 0:
+                del self._entries[key]
+                self.nbytes -= entry["nbytes"]
+                self.stats["evictions"] += 1
+
+    def get(self, key, loader, session=None, slot=None):
+        """Shared value for ``key``, calling ``loader()`` once on a miss; pins it for ``(session, slot)`` when given."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.stats["hits"] += 1
+                self._entries.move_to_end(key)
+                if session is not None:
+                    self._pin((session, slot or key), key)
+                return entry["value"]
+
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                self.stats["misses"] += 1
+                future = self._loading[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+
+        if not owner:
+            value = future.result()
+        else:
+            try:
+                value = loader()
+            except Exception as e:
+                with self._lock:
+                    del self._loading[key]
+                future.set_exception(e)
+                raise
+            if isinstance(value, PricePanel):
+                value.values.setflags(write=False)
+            with self._lock:
+                del self._loading[key]
+                if value is not None:
+                    nbytes = _nbytes(value)
+                    self._entries[key] = {"value": value, "nbytes": nbytes, "refs": 0}
+                    self.nbytes += nbytes
+            future.set_result(value)
+
+        with self._lock:
+            if key in self._entries and session is not None:
+                self._pin((session, slot or key), key)
+            self._expire_holders()
+            self._evict()
+        return value
+
+    def release(self, session):
+        """Unpins everything a session holds (e.g. when it logs out)."""
+        with self._lock:
+            for holder in [h for h in self._holders if h[0] == session]:
+                key, _ = self._holders.pop(holder)
+                if key in self._entries:
+                    self._entries[key]["refs"] -= 1
+            self._evict()
+
+    def metrics(self):
+        """Entries, bytes against the budget, active sessions and the hit rate."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "pinned": sum(1 for entry in self._entries.values() if entry["refs"] > 0),
+                "sessions": len({holder[0] for holder in self._holders}),
+                "bytes": self.nbytes,
+                "budget_bytes": self.budget_bytes,
+                "hit_rate": (self.stats["hits"] + self.stats["coalesced"]) / lookups if lookups else 0.0
+            }
+
+
+_DATA_PLANE = DataPlane()
+
+
+def get_data_plane():
+    """Process-wide data plane shared by all sessions."""
+    return _DATA_PLANE
+
+
+def shared_prices(tickers, session=None, slot="prices", period="3y", interval="1wk"):
+    """Read-only price panel for the tickers, shared across sessions (empty when no data).
+
+    The key carries the price store's refresh epoch, so each refresh is a new version: sessions
+    move their pins to it on their next rerun and the previous version becomes evictable.
+    """
+    tickers = [tickers] if isinstance(tickers, str) else tickers
+    key = ("prices", tuple(sorted(tickers)), period, interval, db.data_version())
+
+    panel = _DATA_PLANE.get(key, lambda: db.fetch_price_panel(tickers, period=period, interval=interval), session, slot)
+    return panel if panel is not None else PricePanel.from_frame(pd.DataFrame())
+
+
+def shared_benchmark(session=None, period="3y", interval="1wk"):
+    """S&P 500 closing prices for comparison, shared across sessions."""
+    panel = shared_prices("^GSPC", session, "benchmark", period, interval)
+    return panel.prices.iloc[:, 0] if not panel.empty else pd.Series(dtype="float32")
+
+
+def shared_forecast(panel, session=None, **forecast_args):
+    """Forecasted returns for a panel, computed once per data version and shared across sessions."""
+    from forecasting import forecast_stock_prices
+
+    key = ("forecast", panel.key, tuple(sorted(forecast_args.items())))
+    return _DATA_PLANE.get(key, lambda: forecast_stock_prices(panel, **forecast_args), session, "forecast")
+
+
+def shared_ticker_info(session=None):
+    """Live ticker info table, refetched at most once per INFO_TTL for all sessions together."""
+    from explainability import build_ticker_info
+
+    key = ("ticker_info", int(time.time() // INFO_TTL))
+    return _DATA_PLANE.get(key, build_ticker_info, session, "ticker_info")
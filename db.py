@@ -0,0 +1,176 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+import pandas as pd
+import numpy as np
+from panel import PricePanel
+from downloader import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Bars are downloaded once at BASE_INTERVAL; coarser views are resampled from it
+BASE_INTERVAL = "1d"
+INTRADAY_INTERVALS = ["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"]
+RESAMPLE_PERIODS = {
+    "1wk": "W-FRI",
+    "1mo": "M"
+}
+PERIODS_PER_YEAR = {
+    "1d": 252,
+    "1wk": 52,
+    "1mo": 12,
+    "1h": 252 * 7,
+    "60m": 252 * 7,
+    "30m": 252 * 13
+}
+
+MEMORY_BUDGET_MB = float(os.getenv("PRICE_MEMORY_BUDGET_MB", 256))
+REFRESH_SECONDS = int(os.getenv("PRICE_REFRESH_SECONDS", 3600))  # Open-ended windows are re-downloaded this often
+
+
+class PriceStore:
+    """Process-wide LRU store of read-only price panels, bounded by a memory budget.
+
+    Every Streamlit session reads the same float32 arrays; callers get DataFrame views
+    over them, so a session only pays for its own index objects, not a copy of the prices.
+    """
+
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            panel = self._entries.get(key)
+            if panel is not None:
+                self._entries.move_to_end(key)
+            return panel
+
+    def _measure(self):
+        # Panels cache returns/log returns/normalized levels on first use, so sizes are re-read, not tracked
+        self.nbytes = sum(panel.nbytes for panel in self._entries.values())
+
+    def put(self, key, panel):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = panel
+            self._measure()
+
+            # Evict least recently used panels, always keeping the one just stored
+            while self.nbytes > self.budget_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return panel
+
+    def usage(self):
+        """Entries and bytes (prices, masks and cached derivatives) held against the budget."""
+        with self._lock:
+            self._measure()
+            return {"entries": len(self._entries), "bytes": self.nbytes, "budget_bytes": self.budget_bytes}
+
+
+_PRICE_STORE = PriceStore()
+
+
+def data_version(end=None):
+    """Refresh epoch for windows that run up to today (None for a fixed end date, whose bars never change)."""
+    return int(time.time() // REFRESH_SECONDS) if end is None else None
+
+
+def _store_key(tickers, period, interval, start=None, end=None):
+    """Cache key for one downloaded price panel; open-ended windows expire with the refresh epoch."""
+    tickers = [tickers] if isinstance(tickers, str) else tickers
+    return (tuple(sorted(tickers)), period if start is None else None, interval, start, end, data_version(end))
+
+
+def to_compact(df):
+    """Converts a price frame to a read-only float32 panel (half the memory of float64)."""
+    return PricePanel.from_frame(df.astype(np.float32))
+
+
+def compact_portfolio(portfolio_df):
+    """Stores the repeated Ticker/Company/Method strings of a portfolio table as categoricals."""
+    portfolio_df = portfolio_df.copy()
+    for column in ("Ticker", "Company", "Method"):
+        if column in portfolio_df:
+            portfolio_df[column] = portfolio_df[column].astype("category")
+    return portfolio_df
+
+
+def frame_memory(obj):
+    """Bytes referenced by a DataFrame, Series or PricePanel."""
+    if isinstance(obj, PricePanel):
+        return obj.nbytes
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True, index=True))
+    return 0
+
+
+def memory_report(session_state=None):
+    """Shared store and snapshot usage plus the bytes held by frames in one session's state."""
+    from snapshots import snapshot_usage
+
+    report = _PRICE_STORE.usage()
+    report["snapshot_bytes"] = snapshot_usage()["bytes"]
+    if session_state is not None:
+        report["session_bytes"] = sum(frame_memory(value) for value in session_state.values())
+    return report
+
+
+def _fetch_history_panel(tickers, period="3y", interval=BASE_INTERVAL, start=None, end=None):
+    """Stored panel of closing prices at the given bar interval, downloading it on a miss (None on failure)."""
+    key = _store_key(tickers, period, interval, start, end)
+    panel = _PRICE_STORE.get(key)
+    if panel is not None:
+        return panel
+
+    try:
+        if start is not None:
+            df = get_scheduler().download(tickers, start=start, end=end, interval=interval)
+        else:
+            df = get_scheduler().download(tickers, period=period, interval=interval)
+        if df.empty:
+            raise ValueError("Yahoo Finance returned an empty DataFrame.")
+    except Exception as e:
+        logger.error("Error fetching stock data: %s", e)
+        return None
+
+    return _PRICE_STORE.put(key, to_compact(df))
+
+
+def resample_prices(prices, interval):
+    """Returns the last close of each week/month from higher-frequency bars, indexed by the last trading date."""
+    periods = prices.index.to_period(RESAMPLE_PERIODS[interval])
+    resampled = prices.groupby(periods).last()
+    resampled.index = pd.Series(prices.index, index=prices.index).groupby(periods).max().values
+    return resampled
+
+
+def fetch_price_panel(tickers, period="3y", interval="1wk", start=None, end=None):
+    """Like fetch_stock_data, but returns the stored read-only panel itself (None when no data)."""
+    if interval not in RESAMPLE_PERIODS:
+        # Daily and intraday bars are served as downloaded
+        return _fetch_history_panel(tickers, period, interval, start, end)
+
+    cache_key = (_store_key(tickers, period, BASE_INTERVAL, start, end), interval)
+    panel = _PRICE_STORE.get(cache_key)
+    if panel is not None:
+        return panel
+
+    daily = _fetch_history_panel(tickers, period, BASE_INTERVAL, start, end)
+    if daily is None:
+        return None
+
+    return _PRICE_STORE.put(cache_key, to_compact(resample_prices(daily.prices, interval)))
+
+
+def fetch_stock_data(tickers, period="3y", interval="1wk", start=None, end=None):
+    """Fetch historical closing prices; weekly/monthly views come from the resampling cache over daily bars."""
+    panel = fetch_price_panel(tickers, period, interval, start, end)
+    return panel.prices if panel is not None else pd.DataFrame()
@@ -0,0 +1,211 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import pandas as pd
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50  # Tickers per multi-ticker Yahoo request
+MAX_CONCURRENCY = 4  # Requests in flight across the whole process
+RATE_PER_SECOND = 2.0  # Sustained request rate across the whole process
+MAX_RETRIES = 4
+BASE_DELAY = 1.0  # Seconds before the first retry; doubles each attempt
+MAX_DELAY = 30.0
+
+
+def yahoo_close_provider(tickers, **params):
+    """Downloads closing prices for a batch of tickers from Yahoo Finance (tickers as columns).
+
+    yfinance reports throttling and network errors by logging and returning an empty frame, so
+    an empty or all-NaN result is raised here for the scheduler to back off and retry.
+    """
+    df = yf.download(tickers, progress=False, **params)
+    if df.empty:
+        raise ValueError(f"Yahoo Finance returned no data for {len(tickers)} tickers.")
+    close = df["Close"] if "Close" in df else df
+    close = close.to_frame(tickers[0]) if isinstance(close, pd.Series) else close
+    if close.isna().all().all():
+        raise ValueError(f"Yahoo Finance returned only missing prices for {len(tickers)} tickers.")
+    return close
+
+
+def yahoo_info_provider(ticker):
+    """Fetches the quote summary for one ticker from Yahoo Finance."""
+    return yf.Ticker(ticker).info
+
+
+class _RateLimiter:
+    """Token bucket shared by every request the scheduler sends."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class DownloadScheduler:
+    """Single gateway for market data requests.
+
+    Concurrent requests for the same ticker and range share one in-flight fetch, large
+    universes are split into ``batch_size`` multi-ticker requests, every request passes a
+    global concurrency cap and token-bucket rate limit, and failures are retried with
+    jittered exponential backoff. Providers are injectable, so the behaviour can be
+    checked against a local fake instead of Yahoo.
+    """
+
+    def __init__(self, provider=yahoo_close_provider, info_provider=yahoo_info_provider, batch_size=BATCH_SIZE,
+                 max_concurrency=MAX_CONCURRENCY, rate_per_second=RATE_PER_SECOND, max_retries=MAX_RETRIES,
+                 base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+        self.provider = provider
+        self.info_provider = info_provider
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="download")
+        self._limiter = _RateLimiter(rate_per_second)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "coalesced": 0, "missing": 0}
+
+    def _call_with_retry(self, fn, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self._limiter.acquire()
+            with self._lock:
+                self.stats["requests"] += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self.stats["failures"] += 1
+                    raise
+                self._backoff(attempt, f"Download failed ({e})")
+
+    def _claim(self, keys):
+        """Returns futures for every key, plus the keys this caller must fetch itself."""
+        futures, owned = {}, []
+        with self._lock:
+            for key in keys:
+                future = self._in_flight.get(key)
+                if future is None:
+                    future = Future()
+                    self._in_flight[key] = future
+                    owned.append(key)
+                else:
+                    self.stats["coalesced"] += 1
+                futures[key] = future
+        return futures, owned
+
+    def _release(self, keys, futures, results=None, error=None):
+        with self._lock:
+            for key in keys:
+                self._in_flight.pop(key, None)
+        for key in keys:
+            if error is not None:
+                futures[key].set_exception(error)
+            else:
+                futures[key].set_result(results.get(key))
+
+    def _backoff(self, attempt, reason):
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+        with self._lock:
+            self.stats["retries"] += 1
+        logger.warning("%s, retrying in %.1fs", reason, delay)
+        time.sleep(delay)
+
+    def _fetch_batch(self, tickers, params, keys, futures):
+        """Fetches a batch, re-requesting (with backoff) any tickers the provider left out."""
+        results, remaining = {}, list(tickers)
+        try:
+            for attempt in range(self.max_retries + 1):
+                close = self._call_with_retry(self.provider, remaining, **dict(params))
+                for ticker in remaining:
+                    if ticker in close and close[ticker].notna().any():
+                        results[ticker] = close[ticker]
+                remaining = [ticker for ticker in remaining if ticker not in results]
+                if not remaining or attempt == self.max_retries:
+                    break
+                self._backoff(attempt, f"No data for {len(remaining)} tickers ({', '.join(remaining[:5])})")
+        except Exception as e:
+            if not results:
+                self._release(keys, futures, error=e)
+                return
+            logger.error("Download failed for %d tickers: %s", len(remaining), e)
+
+        if remaining:
+            with self._lock:
+                self.stats["missing"] += len(remaining)
+            logger.warning("No data after retries for: %s", ", ".join(remaining))
+        self._release(keys, futures, {key: results[key[0]] for key in keys if key[0] in results})
+
+    def download(self, tickers, **params):
+        """Closing prices for the tickers (columns) over the requested range; missing tickers are omitted."""
+        tickers = [tickers] if isinstance(tickers, str) else list(dict.fromkeys(tickers))
+        params_key = tuple(sorted(params.items()))
+        keys = [(ticker, params_key) for ticker in tickers]
+        futures, owned = self._claim(keys)
+
+        # Balanced batches of at most batch_size (e.g. 51 tickers -> 26 + 25, not 50 + 1)
+        n_batches = -(-len(owned) // self.batch_size)
+        size = -(-len(owned) // n_batches) if n_batches else 0
+        for start in range(0, len(owned), max(size, 1)):
+            batch = owned[start:start + size]
+            self._executor.submit(self._fetch_batch, [key[0] for key in batch], params_key, batch, futures)
+
+        columns = {}
+        for key in keys:
+            series = futures[key].result()
+            if series is not None:
+                columns[key[0]] = series
+        return pd.DataFrame(columns) if columns else pd.DataFrame()
+
+    def info(self, ticker):
+        """Quote summary for one ticker, sharing one in-flight request between concurrent callers."""
+        key = (ticker, "info")
+        futures, owned = self._claim([key])
+        if owned:
+            def fetch():
+                try:
+                    self._release(owned, futures, {key: self._call_with_retry(self.info_provider, ticker)})
+                except Exception as e:
+                    self._release(owned, futures, error=e)
+            self._executor.submit(fetch)
+        return futures[key].result()
+
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler that every data fetch goes through."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = DownloadScheduler()
+        return _SCHEDULER
+
+
+def set_scheduler(scheduler):
+    """Replaces the process-wide scheduler (e.g. with one backed by a local fake provider)."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        _SCHEDULER = scheduler
@@ -1,10 +1,14 @@
-import yfinance as yf
+import numpy as np
+import pandas as pd
+
+from downloader import get_scheduler
+
+_ATTRIBUTION_CACHE = {}
 
 def get_stock_data(ticker):
     """Fetch live stock price, PE ratio, market cap, dividend yield, and 52-week high/low using Yahoo Finance."""
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info  # Retrieve stock info
+        info = get_scheduler().info(ticker)  # Retrieve stock info (coalesced, rate-limited)
 
         return {
             "price": info.get("currentPrice", "N/A"),
@@ -17,7 +21,68 @@ def get_stock_data(ticker):
     except Exception as e:
         return {"price": "Error", "pe_ratio": "Error", "market_cap": "Error", "dividend_yield": "Error", "high_52_week": "Error", "low_52_week": "Error"}
 
-def explain_stock_choice(ticker):
+def risk_attribution(weights, covariance, expected_returns=None):
+    """Risk and return attribution for every holding from one covariance-weights product.
+
+    Returns a per-ticker table (weight, marginal risk contribution, total and percentage risk
+    contribution, return contribution) and the portfolio's volatility and diversification ratio.
+    Results are cached for the latest portfolio; the optimizer's covariance and expected returns
+    are cached objects, so they are matched by identity rather than by hashing their contents.
+    """
+    weights = weights[weights > 0]
+    weights_key = tuple(weights.items())
+    cached = _ATTRIBUTION_CACHE.get(weights_key)
+    if cached and cached["covariance"] is covariance and cached["expected_returns"] is expected_returns:
+        return cached["result"]
+
+    tickers = list(weights.index)
+    w = weights.to_numpy(dtype=float)
+    cov = covariance.reindex(index=tickers, columns=tickers).fillna(0).to_numpy(dtype=float)
+    mu = None if expected_returns is None else expected_returns.reindex(tickers).fillna(0).to_numpy(dtype=float)
+
+    cov_w = cov @ w
+    volatility = float(np.sqrt(w @ cov_w))
+    marginal = cov_w / volatility
+    contribution = w * marginal
+
+    table = pd.DataFrame({
+        "Weight": w,
+        "Marginal Risk": marginal,
+        "Risk Contribution": contribution,
+        "Risk Contribution (%)": 100 * contribution / volatility
+    }, index=pd.Index(tickers, name="Ticker"))
+    if mu is not None:
+        table["Expected Return Contribution"] = w * mu
+        total_return = (w * mu).sum()
+        table["Return Contribution (%)"] = 100 * w * mu / total_return if total_return else 0.0
+
+    summary = {
+        "volatility": volatility,
+        "diversification_ratio": float(w @ np.sqrt(np.diag(cov)) / volatility)
+    }
+
+    _ATTRIBUTION_CACHE.clear()  # Only the latest portfolio is worth keeping
+    _ATTRIBUTION_CACHE[weights_key] = {
+        "covariance": covariance, "expected_returns": expected_returns, "result": (table, summary)
+    }
+    return table, summary
+
+def explain_attribution(ticker, table):
+    """Data-driven rationale for a holding from its row in the risk attribution table."""
+    if table is None or ticker not in table.index:
+        return None
+    row = table.loc[ticker]
+    text = (f"📐 Holds {row['Weight']:.1%} of the portfolio and contributes {row['Risk Contribution (%)']:.1f}% of its risk "
+            f"(marginal risk {row['Marginal Risk']:.3f}).")
+    if "Return Contribution (%)" in row:
+        text += f" It supplies {row['Return Contribution (%)']:.1f}% of the expected return."
+    if row["Risk Contribution (%)"] < 100 * row["Weight"]:
+        text += " Its risk share is below its weight, so it diversifies the portfolio."
+    else:
+        text += " Its risk share exceeds its weight, so it concentrates portfolio risk."
+    return text
+
+def explain_stock_choice(ticker, attribution=None):
     """In-depth logic behind why the stock is included in the portfolio."""
     explanations = {
         "AAPL": "📱 Apple dominates consumer electronics with iPhones, MacBooks, and a growing services segment, ensuring high margins and stability.",
@@ -38,7 +103,10 @@ def explain_stock_choice(ticker):
         "CVX": "🛢️ Chevron is a major energy corporation involved in every aspect of the oil and natural gas industries.",
         "WMT": "🛒 Walmart is a multinational retail corporation operating a chain of hypermarkets and grocery stores."
     }
-    return explanations.get(ticker, "No specific rationale available.")
+    data_driven = explain_attribution(ticker, attribution)
+    if ticker in explanations:
+        return f"{explanations[ticker]} {data_driven}" if data_driven else explanations[ticker]
+    return data_driven or "No specific rationale available."
 
 def build_ticker_info():
     """Dynamically build stock dictionary with live price, PE ratio, market cap, dividend yield, and 52-week high/low."""
@@ -66,12 +134,7 @@ def build_ticker_info():
     stock_info = {
         ticker: {
             "name": name,
-            "price": get_stock_data(ticker)["price"],
-            "pe_ratio": get_stock_data(ticker)["pe_ratio"],
-            "market_cap": get_stock_data(ticker)["market_cap"],
-            "dividend_yield": get_stock_data(ticker)["dividend_yield"],
-            "high_52_week": get_stock_data(ticker)["high_52_week"],
-            "low_52_week": get_stock_data(ticker)["low_52_week"],
+            **get_stock_data(ticker),  # One quote request per ticker
             "explanation": explain_stock_choice(ticker)
         }
         for ticker, name in ticker_to_company.items()
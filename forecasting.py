@@ -1,5 +1,4 @@
 import numpy as np
-import yfinance as yf
 import pandas as pd
 from pypfopt.efficient_frontier import EfficientFrontier
 from pypfopt.risk_models import risk_matrix
@@ -8,40 +7,57 @@ from statsmodels.tsa.arima.model import ARIMA
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense
 from sklearn.preprocessing import MinMaxScaler
+import db
+from panel import as_panel
+from arima_orders import DEFAULT_ORDER, select_arima_orders
+from arima_state import incremental_arima_forecast
 
-def fetch_stock_data(tickers, start, end):
+def fetch_stock_data(tickers, start, end, interval="1wk"):
     """Fetch historical closing prices for backtesting."""
-    try:
-        df = yf.download(tickers, start=start, end=end, interval="1wk")
-        if df.empty:
-            raise ValueError("Yahoo Finance returned an empty DataFrame.")
-        return df["Close"] if "Close" in df else df
-    except Exception as e:
-        print(f"⚠️ Error fetching stock data: {e}")
-        return pd.DataFrame()
-
-def forecast_stock_prices(data, forecast_periods=12, model_type="ARIMA", fallback_to_historical=True):
-    """Forecast future stock prices using ARIMA or LSTM, with fallbacks for failed predictions."""
+    return db.fetch_stock_data(tickers, start=start, end=end, interval=interval)
+
+def forecast_stock_prices(data, forecast_periods=12, model_type="ARIMA", fallback_to_historical=True, order=DEFAULT_ORDER,
+                          incremental=False):
+    """Forecast future stock prices using ARIMA or LSTM, with fallbacks for failed predictions.
+
+    Pass order="auto" to select an ARIMA order per ticker (searched in parallel and cached), and
+    incremental=True to keep each ticker's fitted model and only filter newly arrived bars.
+    """
     forecasted_returns = {}
+    panel = as_panel(data)
 
-    for ticker in data.columns:
+    orders, searched_params = {}, {}
+    if model_type == "ARIMA" and order == "auto":
+        history = {ticker: panel.column(ticker) for ticker in panel.tickers}
+        orders, searched_params = select_arima_orders({t: s for t, s in history.items() if len(s) >= 50},
+                                                      return_params=True)
+
+    for ticker in panel.tickers:
         try:
-            stock_prices = data[ticker].dropna()
+            stock_prices = panel.column(ticker)
 
             # Ensure there's enough data for forecasting
             if len(stock_prices) < 50:
                 raise ValueError("Not enough data for forecasting")
 
             if model_type == "ARIMA":
-                # Fit ARIMA Model
-                model = ARIMA(stock_prices, order=(5,1,0))
-                model_fit = model.fit()
+                ticker_order = orders.get(ticker, DEFAULT_ORDER if order == "auto" else order)
+                params = searched_params.get(ticker)  # Full-history fit from the order search, if it just ran
+
+                if incremental:
+                    # Reuse the stored model, filtering only the new bars
+                    predicted_price = incremental_arima_forecast(ticker, stock_prices, ticker_order, forecast_periods,
+                                                                 params=params)
+                else:
+                    # Fit ARIMA Model (or only filter when the search already estimated it)
+                    model = ARIMA(stock_prices, order=ticker_order)
+                    model_fit = model.fit() if params is None else model.filter(params)
 
-                # Forecast next 'forecast_periods' weeks
-                forecast = model_fit.forecast(steps=forecast_periods)
+                    # Forecast next 'forecast_periods' weeks
+                    predicted_price = model_fit.forecast(steps=forecast_periods).iloc[-1]
 
                 # Calculate Expected Return based on forecast
-                future_return = (forecast.iloc[-1] - stock_prices.iloc[-1]) / stock_prices.iloc[-1]
+                future_return = (predicted_price - stock_prices.iloc[-1]) / stock_prices.iloc[-1]
             
             elif model_type == "LSTM":
                 # Prepare data for LSTM
@@ -92,3 +108,12 @@ def forecast_stock_prices(data, forecast_periods=12, model_type="ARIMA", fallbac
                 forecasted_returns[ticker] = np.nan
 
     return forecasted_returns
+
+def calculate_portfolio_growth(portfolio, data):
+    """Simulates portfolio performance using historical stock prices (normalized to 1 at the start)."""
+    if portfolio.empty or data.empty:
+        return pd.Series(dtype="float32")
+
+    panel = as_panel(data).select(portfolio["Ticker"].tolist())
+    weights = portfolio.set_index("Ticker")["Allocation"]
+    return panel.weighted_growth(weights)
@@ -1,14 +1,15 @@
+import uuid
 import streamlit as st
 import pandas as pd
-from portfolio import generate_portfolio
-from forecasting import fetch_sp500_data, calculate_portfolio_growth
-from forecasting import fetch_stock_data
+import matplotlib.pyplot as plt
+from portfolio import generate_portfolio, prepare_optimizer_inputs
+from forecasting import calculate_portfolio_growth
 from config import TICKER_TO_COMPANY
-from db import get_stocks_from_selected_sectors, fetch_stock_data
-from explainability import explain_stock_choice
-from explainability import build_ticker_info
+from db import get_stocks_from_selected_sectors, memory_report, data_version
+from explainability import explain_stock_choice, risk_attribution
 from auth import authentication, save_portfolio, load_portfolio
-from forecasting import forecast_stock_prices
+from panel import PricePanel
+from dataplane import get_data_plane, shared_prices, shared_benchmark, shared_ticker_info
 
 st.subheader("🔮 Forecasted Portfolio Growth Over Time")
 
@@ -22,19 +23,26 @@ st.sidebar.header("Investment Preferences")
 investment_amount = st.sidebar.number_input("💰 Investment Amount ($)", min_value=1000, step=500, key="investment")
 risk_tolerance = st.sidebar.selectbox("📉 Risk Tolerance", ["Low", "Medium", "High"], key="risk")
 selected_sectors = st.sidebar.multiselect("📊 Preferred Sectors", ["Technology", "Healthcare", "Finance", "Energy", "Consumer Goods", "Industrials"], key="sectors")
+allocation_label = st.sidebar.selectbox("🧮 Allocation Method", ["Mean-Variance", "Hierarchical Risk Parity"], key="allocation_method")
+allocation_method = "hrp" if allocation_label == "Hierarchical Risk Parity" else "mean_variance"
 
-# Ensure portfolio has valid tickers before forecasting
-if not portfolio.empty:
-    forecasted_returns = forecast_stock_prices(historical_data, forecast_periods=12, model_type="LSTM")
+# Identify this session to the shared data plane, which pins the data it is showing
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+session_id = st.session_state["session_id"]
 
 # Maintain portfolio persistence across tabs
 if "portfolio" not in st.session_state:
     st.session_state["portfolio"] = pd.DataFrame()
 
 if st.sidebar.button("🚀 Generate Portfolio"):
-    st.session_state["portfolio"] = generate_portfolio(investment_amount, risk_tolerance, selected_sectors)
+    st.session_state["portfolio"] = generate_portfolio(investment_amount, risk_tolerance, selected_sectors, allocation_method=allocation_method)
+    # Keep the optimizer's own (cached) covariance and expected returns so the attribution explains this allocation
+    st.session_state["optimizer_inputs"] = prepare_optimizer_inputs(selected_sectors)
     
     if not st.session_state["portfolio"].empty:
+        if st.session_state["portfolio"]["Method"].iloc[0] != allocation_method:
+            st.info("ℹ️ Mean-variance optimization found no feasible portfolio, so Hierarchical Risk Parity was used.")
         st.write("📊 Your AI-Optimized Portfolio")
         st.dataframe(st.session_state["portfolio"])
 
@@ -45,6 +53,18 @@ if st.sidebar.button("🚀 Generate Portfolio"):
     else:
         st.warning("⚠️ No valid portfolio generated. Please adjust your settings.")
 
+# Shared price store and data plane vs. this session's own frames
+memory = memory_report(st.session_state)
+plane = get_data_plane().metrics()
+st.sidebar.caption(
+    f"💾 Shared price data: {memory['bytes'] / 1e6:.1f} / {memory['budget_bytes'] / 1e6:.0f} MB · "
+    f"Snapshots: {memory['snapshot_bytes'] / 1e6:.1f} MB · This session: {memory['session_bytes'] / 1e3:.1f} KB"
+)
+st.sidebar.caption(
+    f"🔁 Shared data plane: {plane['entries']} entries, {plane['bytes'] / 1e6:.1f} / {plane['budget_bytes'] / 1e6:.0f} MB · "
+    f"{plane['sessions']} sessions · Hit rate {plane['hit_rate']:.0%}"
+)
+
 if st.sidebar.button("📂 Load Saved Portfolio"):
     portfolio_df = load_portfolio(st.session_state["user"])
     
@@ -58,7 +78,7 @@ st.set_page_config(page_title="AI-Powered Portfolio Generator", layout="wide")
 st.title("📈 AI-Powered Portfolio Generator")
 
 # Fetch live stock data & explanations
-stock_data = build_ticker_info()
+stock_data = shared_ticker_info(session_id)
 st.write(stock_data)  # Display live stock data and explanations in the UI
 
 
@@ -76,19 +96,19 @@ with tab1:
         st.subheader("📈 Portfolio Growth vs. S&P 500")
         filtered_tickers = get_stocks_from_selected_sectors(selected_sectors)
 
+        # One read-only panel per universe, shared with every other session showing it
         if filtered_tickers:
-            historical_data = fetch_stock_data(filtered_tickers)
-            sp500_data = fetch_sp500_data()
+            price_panel = shared_prices(filtered_tickers, session_id)
+            sp500_data = shared_benchmark(session_id)
         else:
-            historical_data = pd.DataFrame()
+            price_panel = PricePanel.from_frame(pd.DataFrame())
             sp500_data = pd.DataFrame()
 
-        if not historical_data.empty and not sp500_data.empty:
-            portfolio_growth = calculate_portfolio_growth(portfolio, historical_data)
+        if not price_panel.empty and not sp500_data.empty:
+            portfolio_growth = calculate_portfolio_growth(portfolio, price_panel)
             sp500_growth = sp500_data / sp500_data.iloc[0]  # Normalize S&P 500 to start at 1
 
             # Plot Performance Comparison
-            import matplotlib.pyplot as plt
             fig, ax = plt.subplots(figsize=(8, 5))
             ax.plot(portfolio_growth.index, portfolio_growth, label="AI-Powered Portfolio", color="blue", linewidth=2)
             ax.plot(sp500_growth.index, sp500_growth, label="S&P 500", color="red", linestyle="dashed", linewidth=2)
@@ -102,26 +122,88 @@ with tab1:
         else:
             st.warning("⚠️ Portfolio or S&P 500 data is unavailable. Generate a portfolio first.")
 
+        # ⚠️ Risk Analytics
+        st.subheader("⚠️ Portfolio Risk Analytics")
+        from risk import portfolio_returns, rolling_volatility, risk_report
+        from backtesting import fetch_benchmark_panel
+
+        if not price_panel.empty:
+            weights = portfolio.set_index("Ticker")["Allocation"]
+            returns = portfolio_returns(price_panel, weights)
+            benchmark_panel = fetch_benchmark_panel()
+            benchmark_returns = benchmark_panel.returns if not benchmark_panel.empty else None
+
+            st.dataframe(risk_report(returns, benchmark_returns))
+
+            rolling_vol = rolling_volatility(returns, window=26)
+            fig, ax = plt.subplots(figsize=(8, 3))
+            ax.plot(rolling_vol.index, rolling_vol, color="purple", linewidth=2)
+            ax.set_ylabel("Annualized Volatility", fontsize=12)
+            ax.set_title("📉 26-Week Rolling Volatility", fontsize=14, fontweight="bold")
+            ax.grid(alpha=0.3)
+            st.pyplot(fig)
+        else:
+            st.warning("⚠️ Portfolio data is missing. Generate a portfolio first to see risk analytics.")
+
+        # 🎚️ What-If: Target Return
+        st.subheader("🎚️ What-If: Target Return")
+        from whatif import FrontierWhatIf
+
+        # Build the frontier problem once per sector selection and data refresh; slider moves only re-solve it
+        whatif_key = (tuple(sorted(selected_sectors)), data_version())
+        if st.session_state.get("whatif_key") != whatif_key:
+            expected_returns, covariance = prepare_optimizer_inputs(selected_sectors)
+            st.session_state["whatif"] = FrontierWhatIf(expected_returns, covariance) if covariance is not None else None
+            st.session_state["whatif_key"] = whatif_key
+
+        whatif = st.session_state["whatif"]
+        if whatif is not None:
+            target_return = st.slider("🎯 Target Annual Return", 0.0, 0.5, 0.12, 0.01, key="target_return")
+            try:
+                whatif_weights = whatif.solve_return(target_return)
+            except ValueError as e:
+                st.warning(f"⚠️ {e}")
+                whatif_weights = None
+
+            if whatif_weights is not None:
+                if whatif.solved_target < target_return:
+                    st.info(f"ℹ️ {target_return:.0%} is above the highest attainable return; "
+                            f"showing the portfolio for {whatif.solved_target:.1%}.")
+                expected, volatility = whatif.performance(whatif_weights)
+
+                whatif_df = whatif_weights[whatif_weights > 0].rename("Allocation").rename_axis("Ticker").reset_index()
+                whatif_df["Allocation (%)"] = (whatif_df["Allocation"] * 100).round(2)
+                whatif_df["Investment ($)"] = (whatif_df["Allocation"] * investment_amount).round(2)
+                st.dataframe(whatif_df[["Ticker", "Allocation (%)", "Investment ($)"]])
+                st.write(f"📈 **Expected return:** {expected:.1%} · 📉 **Volatility:** {volatility:.1%}")
+        else:
+            st.warning("⚠️ No price data for the selected sectors.")
+
         # 🔮 Forecasted Portfolio Growth
         st.subheader("🔮 Forecasted Portfolio Growth Over Time")
         
-        # Ensure portfolio has valid tickers before forecasting
-        from forecasting import forecast_stock_prices
-        
-        if not historical_data.empty:
-            forecasted_returns = forecast_stock_prices(historical_data, forecast_periods=12, model_type="LSTM")
+        # Simulate correlated return paths from historical mean/covariance
+        from simulation import project_portfolio
+
+        projection = project_portfolio(portfolio, price_panel, horizon=52, n_paths=20000)
 
-            # Generate projected portfolio value based on forecasted returns
-            projected_growth = portfolio.copy()
-            projected_growth["Projected Investment ($)"] = projected_growth["Investment ($)"] * (1 + forecasted_returns)
+        if projection is not None:
+            bands = projection["bands"]
 
-            # Plot future portfolio growth
+            # Plot percentile fan of projected portfolio value
             fig, ax = plt.subplots(figsize=(8, 5))
-            ax.barh(projected_growth["Ticker"], projected_growth["Projected Investment ($)"], color="green", edgecolor="black")
-            ax.set_xlabel("Projected Investment ($)", fontsize=12)
+            ax.fill_between(bands.index, bands["P5"], bands["P95"], color="green", alpha=0.15, label="5th–95th percentile")
+            ax.fill_between(bands.index, bands["P25"], bands["P75"], color="green", alpha=0.3, label="25th–75th percentile")
+            ax.plot(bands.index, bands["P50"], color="green", linewidth=2, label="Median")
+            ax.set_xlabel("Weeks Ahead", fontsize=12)
+            ax.set_ylabel("Projected Portfolio Value ($)", fontsize=12)
             ax.set_title("🔮 Projected Portfolio Growth", fontsize=14, fontweight="bold")
-            ax.grid(axis="x", linestyle="--", alpha=0.7)
+            ax.legend()
+            ax.grid(alpha=0.3)
             st.pyplot(fig)
+
+            st.write(f"📉 **Probability of loss after 1 year:** {projection['prob_loss_final']:.1%}")
+            st.write(f"💵 **Expected value after 1 year:** ${projection['expected_value']:,.2f}")
         else:
             st.warning("⚠️ Portfolio data is missing. Generate a portfolio first to see projections.")
 
@@ -137,12 +219,45 @@ with tab1:
         else:
             st.warning("⚠️ Portfolio data is missing. Generate a portfolio first to see backtesting results.")
 
+        # 🧨 Historical Stress Tests
+        st.subheader("🧨 Historical Stress Tests")
+        from stress import stress_test
+
+        market_shock = st.slider("📉 Custom S&P 500 Shock (%)", -50, 0, -20, 5, key="market_shock")
+        tech_shock = st.slider("💻 Custom Nasdaq-100 Shock (%)", -50, 0, -30, 5, key="tech_shock")
+        factor_shocks = {
+            f"S&P 500 {market_shock}%": {"S&P 500": market_shock / 100},
+            f"Nasdaq-100 {tech_shock}%": {"Nasdaq-100": tech_shock / 100}
+        }
+
+        stress_results = stress_test(portfolio.set_index("Ticker")["Allocation"], factor_shocks=factor_shocks)
+        if not stress_results.empty:
+            st.dataframe(stress_results.droplevel("Portfolio"))
+        else:
+            st.warning("⚠️ No price history available for stress testing.")
+
 
 with tab2:
     st.subheader("🤖 AI Investment Logic")
-    selected_stock = st.selectbox("📌 Select a stock to understand its rationale:", options=list(TICKER_TO_COMPANY.keys()))
-    explanation = explain_stock_choice(selected_stock)
-    st.write(f"**{TICKER_TO_COMPANY[selected_stock]} ({selected_stock})**")
+    portfolio = st.session_state["portfolio"]
+    attribution = None
+
+    if not portfolio.empty:
+        # Risk/return attribution for every holding from the optimizer's covariance and expected returns
+        expected_returns, covariance = st.session_state.get("optimizer_inputs", (None, None))
+
+        if covariance is not None:
+            weights = portfolio.set_index("Ticker")["Allocation"]
+            attribution, summary = risk_attribution(weights, covariance, expected_returns)
+
+            st.dataframe(attribution)
+            st.write(f"🧩 **Diversification ratio:** {summary['diversification_ratio']:.2f} · "
+                     f"**Portfolio volatility:** {summary['volatility']:.1%}")
+
+    stock_options = list(attribution.index) if attribution is not None else list(TICKER_TO_COMPANY.keys())
+    selected_stock = st.selectbox("📌 Select a stock to understand its rationale:", options=stock_options)
+    explanation = explain_stock_choice(selected_stock, attribution)
+    st.write(f"**{TICKER_TO_COMPANY.get(selected_stock, selected_stock)} ({selected_stock})**")
     st.write(f"💡 **Reasoning:** {explanation}")
 
 with tab3:
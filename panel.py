@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+
+class PricePanel:
+    """Aligned price history shared by the forecast, risk and backtest stages.
+
+    Holds one contiguous (dates x tickers) float32 array with a validity mask. Returns,
+    log returns and normalized levels are computed on first use and cached on the panel,
+    so each stage reads the same arrays instead of reshaping its own copy of the data.
+    """
+
+    def __init__(self, values, dates, tickers):
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.values.setflags(write=False)
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(tickers)
+        self.mask = ~np.isnan(self.values)
+        self._cache = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Builds a panel from a (dates x tickers) price DataFrame, reusing its array when already float32."""
+        if isinstance(df, cls):
+            return df
+        if isinstance(df, pd.Series):
+            df = df.to_frame()
+        return cls(df.to_numpy(dtype=np.float32), df.index, df.columns)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def empty(self):
+        return self.values.size == 0
+
+    @property
+    def nbytes(self):
+        """Bytes held by the prices, mask and every cached derivative (grows as derivatives are used)."""
+        return self.values.nbytes + self.mask.nbytes + sum(values.nbytes for values in self._cache.values())
+
+    @property
+    def key(self):
+        """Identifies the panel contents for downstream caches (universe, length, last date and last bar)."""
+        if not len(self.dates):
+            return (tuple(self.tickers), 0, None, b"")
+        return (tuple(self.tickers), len(self.dates), str(self.dates[-1]), self.values[-1].tobytes())
+
+    def _frame(self, values, dates):
+        """Wraps an array as a DataFrame without copying it."""
+        return pd.DataFrame(values, index=dates, columns=self.tickers, copy=False)
+
+    def _cached(self, name, compute):
+        if name not in self._cache:
+            result = compute()
+            result.setflags(write=False)
+            self._cache[name] = result
+        return self._cache[name]
+
+    @property
+    def prices(self):
+        return self._frame(self.values, self.dates)
+
+    @property
+    def returns(self):
+        """Simple period returns (NaN wherever either bar is missing)."""
+        values = self._cached("returns", lambda: self.values[1:] / self.values[:-1] - 1)
+        return self._frame(values, self.dates[1:])
+
+    @property
+    def log_returns(self):
+        values = self._cached("log_returns", lambda: np.diff(np.log(self.values), axis=0))
+        return self._frame(values, self.dates[1:])
+
+    @property
+    def normalized(self):
+        """Prices divided by each ticker's first valid price (base 1.0)."""
+        def compute():
+            first_valid = np.where(self.mask.any(axis=0), self.mask.argmax(axis=0), 0)
+            base = self.values[first_valid, np.arange(self.values.shape[1])]
+            return self.values / base
+        return self._frame(self._cached("normalized", compute), self.dates)
+
+    def truncate(self, as_of):
+        """Read-only view of the history up to and including ``as_of``.
+
+        Rows are sliced, not copied, and any derivatives already cached on this panel are
+        sliced along with them (a prefix of the returns is the returns of the prefix).
+        """
+        n = self.dates.searchsorted(pd.Timestamp(as_of), side="right")
+        if n == len(self.dates):
+            return self
+        view = PricePanel.__new__(PricePanel)
+        view.values = self.values[:n]
+        view.dates = self.dates[:n]
+        view.tickers = self.tickers
+        view.mask = self.mask[:n]
+        view._cache = {
+            name: values[:n] if name == "normalized" else values[:max(n - 1, 0)]
+            for name, values in self._cache.items()
+        }
+        return view
+
+    def column(self, ticker):
+        """Valid prices for one ticker as a Series."""
+        j = self.tickers.get_loc(ticker)
+        valid = self.mask[:, j]
+        return pd.Series(self.values[valid, j], index=self.dates[valid], name=ticker)
+
+    def select(self, tickers):
+        """Panel restricted to the given tickers (the same panel when nothing is dropped)."""
+        tickers = [t for t in tickers if t in self.tickers]
+        if list(self.tickers) == tickers:
+            return self
+        idx = self.tickers.get_indexer(tickers)
+        return PricePanel(self.values[:, idx], self.dates, tickers)
+
+    def weighted_growth(self, weights):
+        """Normalized growth of a buy-and-hold portfolio; missing tickers and bars count as zero."""
+        w = pd.Series(weights).reindex(self.tickers).fillna(0).to_numpy(dtype=np.float32)
+        normalized = np.nan_to_num(self.normalized.to_numpy())
+        return pd.Series(normalized @ w, index=self.dates)
+
+
+def as_panel(data):
+    """Accepts a PricePanel or a price DataFrame and returns a PricePanel."""
+    return PricePanel.from_frame(data)
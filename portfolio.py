@@ -1,11 +1,20 @@
-import yfinance as yf
+import os
+import logging
+import threading
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
 from pypfopt.efficient_frontier import EfficientFrontier
+from pypfopt.hierarchical_portfolio import HRPOpt
 from pypfopt.risk_models import risk_matrix
 from pypfopt.expected_returns import mean_historical_return
 from statsmodels.tsa.arima.model import ARIMA
-from forecasting import forecast_stock_prices, fetch_stock_data
+from db import compact_portfolio, PERIODS_PER_YEAR
+from dataplane import shared_prices, shared_forecast
+from arima_orders import DEFAULT_ORDER
+from panel import as_panel
+
+logger = logging.getLogger(__name__)
 
 def get_stocks_from_selected_sectors(selected_sectors):
     """Returns a list of stock tickers based on user-selected sectors, including ETFs."""
@@ -29,58 +38,138 @@ def get_stocks_from_selected_sectors(selected_sectors):
     return selected_tickers
 
 
-def fetch_stock_data(tickers, period="3y", interval="1wk"):
-    """Fetch historical closing prices for selected stocks from Yahoo Finance."""
-    try:
-        df = yf.download(tickers, period=period, interval=interval)
-        if df.empty:
-            raise ValueError("Yahoo Finance returned an empty DataFrame.")
-        return df["Close"] if "Close" in df else df
-    except Exception as e:
-        print(f"⚠️ Error fetching stock data: {e}")
-        return pd.DataFrame()
-
-def generate_portfolio(investment_amount, risk_tolerance, selected_sectors, use_forecast=True):
-    """Generates an optimized portfolio using both ETFs and stocks."""
-    
+# Allocation method per risk tier: "mean_variance" (EfficientFrontier QP) or "hrp" (Hierarchical Risk Parity)
+ALLOCATION_METHODS = {
+    "Low": "mean_variance",
+    "Medium": "mean_variance",
+    "High": "mean_variance"
+}
+
+COVARIANCE_CACHE_SIZE = int(os.getenv("COVARIANCE_CACHE_SIZE", 16))  # Universes kept, least recently used dropped
+
+_COVARIANCE_CACHE = OrderedDict()
+_COVARIANCE_LOCK = threading.Lock()
+
+def get_covariance(data, frequency=252):
+    """Returns the annualized covariance matrix for the price data, reusing the cached one when the data is unchanged."""
+    panel = as_panel(data)
+    key = panel.key + (frequency,)
+    with _COVARIANCE_LOCK:
+        covariance = _COVARIANCE_CACHE.get(key)
+        if covariance is not None:
+            _COVARIANCE_CACHE.move_to_end(key)
+            return covariance
+
+    covariance = risk_matrix(panel.returns, returns_data=True, frequency=frequency).astype(float)
+    with _COVARIANCE_LOCK:
+        _COVARIANCE_CACHE[key] = covariance
+        while len(_COVARIANCE_CACHE) > COVARIANCE_CACHE_SIZE:
+            _COVARIANCE_CACHE.popitem(last=False)
+    return covariance
+
+def hrp_weights(covariance, linkage_method="single"):
+    """Allocates with Hierarchical Risk Parity: clusters the correlation matrix and splits risk top-down, no QP solver needed."""
+    hrp = HRPOpt(cov_matrix=covariance)
+    hrp.optimize(linkage_method=linkage_method)  # Single linkage runs in O(n²)
+    return hrp.clean_weights()
+
+def resolve_allocation_method(risk_tolerance, allocation_method=None):
+    """Returns the allocation method for a risk tier, from an explicit string, a per-tier dict, or the defaults."""
+    if isinstance(allocation_method, dict):
+        allocation_method = allocation_method.get(risk_tolerance)
+    method = allocation_method or ALLOCATION_METHODS.get(risk_tolerance, "mean_variance")
+    if method not in ("mean_variance", "hrp"):
+        raise ValueError("Invalid allocation_method. Choose 'mean_variance' or 'hrp'.")
+    return method
+
+def prepare_optimizer_inputs(selected_sectors, use_forecast=True, with_returns=True, risk_interval="1d",
+                             prices=None, risk_prices=None):
+    """Fetches the selected universe and returns (expected_returns, covariance), or (None, None) without data.
+
+    Pass ``prices`` (and optionally higher-resolution ``risk_prices``) to use a given history,
+    e.g. a point-in-time snapshot, instead of downloading the latest data.
+    """
     # Step 1️⃣: Get Selected Stocks + ETFs
     filtered_tickers = get_stocks_from_selected_sectors(selected_sectors)
     if not filtered_tickers:
-        return pd.DataFrame()
+        return None, None
 
     # Step 2️⃣: Fetch Stock + ETF Data
-    data = fetch_stock_data(filtered_tickers)
-    if data.empty:
-        return pd.DataFrame()
-
-    # Step 3️⃣: Choose Return Estimation Method
-    if use_forecast:
-        forecasted_returns = forecast_stock_prices(data)
+    if prices is None:
+        panel = shared_prices(filtered_tickers)
+        if panel.empty:
+            return None, None
+    else:
+        panel = as_panel(prices).select(filtered_tickers)
+        if panel.empty:
+            return None, None
+
+    # Step 3️⃣: Choose Return Estimation Method (HRP only needs the covariance)
+    if not with_returns:
+        expected_returns = None
+    elif use_forecast:
+        if prices is None:
+            forecasted_returns = shared_forecast(panel, order="auto", incremental=True)
+        else:
+            # Caller-supplied (point-in-time) history: a fixed order and fresh fits, so the result
+            # depends only on the snapshot and never reads or overwrites the live per-ticker state
+            forecasted_returns = shared_forecast(panel, order=DEFAULT_ORDER, incremental=False)
         expected_returns = pd.Series(forecasted_returns).dropna()
         if expected_returns.empty:
-            expected_returns = mean_historical_return(data)
+            expected_returns = mean_historical_return(panel.prices)
     else:
-        expected_returns = expected_returns.reindex(data.columns).dropna()
+        expected_returns = mean_historical_return(panel.prices)
 
-    # Step 4️⃣: Compute Risk (Covariance Matrix)
-    covariance = risk_matrix(data)
-
-    # Step 5️⃣: Optimize Portfolio (Favor ETFs for Low-Risk Profiles)
-    ef = EfficientFrontier(expected_returns, covariance)
-    
-    if risk_tolerance == "Low":
-        weights = ef.min_volatility()  # Prioritize ETFs for stability
-    elif risk_tolerance == "High":
-        weights = ef.max_sharpe()  # Prioritize growth
+    # Step 4️⃣: Compute Risk (Covariance Matrix) from higher-resolution bars when available
+    if risk_prices is not None:
+        risk_panel = as_panel(risk_prices).select(panel.tickers)
+    elif prices is None:
+        risk_panel = shared_prices(filtered_tickers, interval=risk_interval).select(panel.tickers)
     else:
-        try:
-         weights = ef.efficient_return(target_return=0.12)
-        except Exception:
-            weights = ef.max_sharpe()
+        risk_panel = None  # Never mix the latest bars into a caller-supplied history
+    if risk_panel is None or risk_panel.empty:
+        risk_panel, risk_interval = panel, "1wk"
+    covariance = get_covariance(risk_panel, frequency=PERIODS_PER_YEAR.get(risk_interval, 252))
 
+    return expected_returns, covariance
 
+def generate_portfolio(investment_amount, risk_tolerance, selected_sectors, use_forecast=True, allocation_method=None, risk_interval="1d",
+                       prices=None, risk_prices=None, target_return=0.12):
+    """Generates an optimized portfolio using both ETFs and stocks."""
+    method = resolve_allocation_method(risk_tolerance, allocation_method)
+
+    # Steps 1️⃣-4️⃣: Universe, price data, expected returns (HRP only needs the covariance) and risk
+    expected_returns, covariance = prepare_optimizer_inputs(
+        selected_sectors, use_forecast, with_returns=(method != "hrp"), risk_interval=risk_interval,
+        prices=prices, risk_prices=risk_prices
+    )
+    if covariance is None:
+        return pd.DataFrame()
 
-    cleaned_weights = ef.clean_weights()
+    # Step 5️⃣: Optimize Portfolio (Favor ETFs for Low-Risk Profiles)
+    if method == "hrp":
+        cleaned_weights = hrp_weights(covariance)
+    else:
+        try:
+            ef = EfficientFrontier(expected_returns, covariance.loc[expected_returns.index, expected_returns.index])
+
+            if risk_tolerance == "Low":
+                weights = ef.min_volatility()  # Prioritize ETFs for stability
+            elif risk_tolerance == "High":
+                weights = ef.max_sharpe()  # Prioritize growth
+            else:
+                try:
+                    weights = ef.efficient_return(target_return=target_return)
+                except Exception:
+                    weights = ef.max_sharpe()
+
+            cleaned_weights = ef.clean_weights()
+        except Exception as e:
+            # QP is infeasible or the solver failed (e.g. max_sharpe when no return beats the risk-free rate):
+            # fall back to the solver-free HRP allocation
+            logger.warning("Mean-variance optimization failed for the %s tier, using HRP: %s", risk_tolerance, e)
+            method = "hrp"
+            cleaned_weights = hrp_weights(covariance)
 
     # **Step 6️⃣: Adjust ETF Allocations**  
     # Increase ETF weight for low-risk users, decrease for high-risk
@@ -99,5 +188,6 @@ def generate_portfolio(investment_amount, risk_tolerance, selected_sectors, use_
     portfolio_df = pd.DataFrame(cleaned_weights.items(), columns=["Ticker", "Allocation"])
     portfolio_df["Investment ($)"] = portfolio_df["Allocation"] * investment_amount
     portfolio_df["Allocation (%)"] = portfolio_df["Allocation"] * 100
+    portfolio_df["Method"] = method  # Allocation method actually used, after any fallback
 
-    return portfolio_df
+    return compact_portfolio(portfolio_df)
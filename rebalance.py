@@ -0,0 +1,146 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+from db import fetch_stock_data
+from panel import PricePanel
+
+PAGE_SIZE = 1000
+WRITE_BATCH_SIZE = 500  # Firestore allows at most 500 writes per batch
+DRIFT_TOLERANCE = 0.05  # Absolute weight drift that triggers a trade for a holding
+
+logger = logging.getLogger(__name__)
+
+
+def get_firestore_client():
+    """Firestore client for batch jobs; uses the local emulator when FIRESTORE_EMULATOR_HOST is set."""
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore as gcloud_firestore
+        return gcloud_firestore.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT", "demo-portfolio"))
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(json.loads(os.environ["FIREBASE_CREDENTIALS"])))
+    return firestore.client()
+
+
+def stream_portfolio_pages(client, page_size=PAGE_SIZE):
+    """Yields saved portfolio documents page by page, ordered by document id."""
+    query = client.collection("portfolios").order_by("__name__").limit(page_size)
+    last_doc = None
+    while True:
+        page = list((query.start_after(last_doc) if last_doc else query).stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last_doc = page[-1]
+
+
+def _page_to_matrices(page, tickers):
+    """Target weights (portfolios x tickers), starting values and save dates for one page of documents."""
+    column = {ticker: j for j, ticker in enumerate(tickers)}
+    targets = np.zeros((len(page), len(tickers)))
+    values = np.zeros(len(page))
+    saved_at = []
+
+    for i, doc in enumerate(page):
+        portfolio = doc.to_dict().get("portfolio", {})
+        rows = portfolio.get("Ticker", {})
+        allocation = portfolio.get("Allocation", {})
+        investment = portfolio.get("Investment ($)", {})
+        for row, ticker in rows.items():
+            if ticker in column:
+                targets[i, column[ticker]] = allocation.get(row, 0.0)
+        values[i] = sum(investment.values())
+        saved_at.append(pd.Timestamp(doc.update_time).tz_localize(None) if doc.update_time else pd.NaT)
+
+    weight_sums = targets.sum(axis=1, keepdims=True)
+    targets = np.divide(targets, weight_sums, out=np.zeros_like(targets), where=weight_sums > 0)
+    return targets, values, pd.DatetimeIndex(saved_at)
+
+
+def compute_drift(targets, values, entry_prices, current_prices, tolerance=DRIFT_TOLERANCE):
+    """Marks a batch of portfolios to market and returns current weights, drift and minimal trades.
+
+    Holdings drifting more than ``tolerance`` from target are traded back to target; the net cash
+    of those trades is absorbed by the in-band holdings in proportion to their targets.
+    """
+    growth = np.where(np.isfinite(entry_prices) & (entry_prices > 0), current_prices / entry_prices, 1.0)
+    growth = np.nan_to_num(growth, nan=1.0)
+
+    holdings = targets * values[:, None] * growth
+    totals = holdings.sum(axis=1)
+    safe_totals = np.where(totals > 0, totals, 1.0)[:, None]
+    weights = holdings / safe_totals
+    drift = weights - targets
+
+    out_of_band = np.abs(drift) > tolerance
+    trades = np.where(out_of_band, targets * totals[:, None] - holdings, 0.0)
+
+    in_band_targets = np.where(out_of_band, 0.0, targets)
+    in_band_sums = in_band_targets.sum(axis=1, keepdims=True)
+    residual = -trades.sum(axis=1, keepdims=True)
+    trades += np.divide(in_band_targets * residual, in_band_sums, out=np.zeros_like(trades), where=in_band_sums > 0)
+
+    return weights, drift, trades, totals
+
+
+def run_drift_job(client=None, universe=None, page_size=PAGE_SIZE, tolerance=DRIFT_TOLERANCE, period="3y"):
+    """Computes drift and rebalance trades for every saved portfolio and writes them to 'portfolio_drift'."""
+    client = client or get_firestore_client()
+    if universe is None:
+        from portfolio import get_stocks_from_selected_sectors
+        universe = get_stocks_from_selected_sectors([])
+
+    # One shared price panel for every portfolio, forward-filled so each date has a last known price
+    panel = PricePanel.from_frame(fetch_stock_data(universe, period=period, interval="1d"))
+    if panel.empty:
+        logger.warning("No price data available for the drift job.")
+        return {"portfolios": 0, "needs_rebalance": 0}
+    tickers = list(panel.tickers)
+    filled = panel.prices.ffill().to_numpy(dtype=float)
+    current_prices = filled[-1]
+    as_of = str(panel.dates[-1].date())
+
+    processed, flagged = 0, 0
+    batch, pending_writes = client.batch(), 0
+    for page in stream_portfolio_pages(client, page_size):
+        targets, values, saved_at = _page_to_matrices(page, tickers)
+
+        # Entry prices at each portfolio's save date (history start when older than the panel)
+        entry_rows = np.clip(panel.dates.searchsorted(saved_at.fillna(panel.dates[-1]), side="right") - 1, 0, None)
+        weights, drift, trades, totals = compute_drift(targets, values, filled[entry_rows], current_prices, tolerance)
+        max_drift = np.abs(drift).max(axis=1)
+
+        for i, doc in enumerate(page):
+            trade_idx = np.flatnonzero(np.abs(trades[i]) > 0.01)
+            result = {
+                "as_of": as_of,
+                "total_value": float(totals[i]),
+                "max_drift": float(max_drift[i]),
+                "needs_rebalance": bool(max_drift[i] > tolerance),
+                "weights": {tickers[j]: float(weights[i, j]) for j in np.flatnonzero(targets[i])},
+                "trades": [{"Ticker": tickers[j], "Trade ($)": float(trades[i, j])} for j in trade_idx]
+            }
+            batch.set(client.collection("portfolio_drift").document(doc.id), result)
+            pending_writes += 1
+            flagged += result["needs_rebalance"]
+            if pending_writes == WRITE_BATCH_SIZE:
+                batch.commit()
+                batch, pending_writes = client.batch(), 0
+
+        processed += len(page)
+
+    if pending_writes:
+        batch.commit()
+
+    return {"portfolios": processed, "needs_rebalance": flagged}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Drift job finished: %s", run_drift_job())
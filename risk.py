@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+
+def _as_frame(returns):
+    """Treats a Series as a single-portfolio frame so every metric handles one or many portfolios."""
+    return returns.to_frame() if isinstance(returns, pd.Series) else returns
+
+
+def portfolio_returns(panel, weights):
+    """Period returns of one or many constant-weight portfolios from a PricePanel.
+
+    ``weights`` is a Series (one portfolio) or a DataFrame with one row per portfolio and
+    tickers as columns; missing tickers and bars count as zero return.
+    """
+    weight_frame = weights.to_frame().T if isinstance(weights, pd.Series) else weights
+    w = weight_frame.reindex(columns=panel.tickers).fillna(0).to_numpy(dtype=float)
+    returns = np.nan_to_num(panel.returns.to_numpy(dtype=float))
+    result = pd.DataFrame(returns @ w.T, index=panel.dates[1:], columns=weight_frame.index)
+    return result.iloc[:, 0].rename("Portfolio") if isinstance(weights, pd.Series) else result
+
+
+def rolling_volatility(returns, window=52, periods_per_year=52):
+    """Annualized rolling volatility using running sums, so each step costs O(1) instead of O(window)."""
+    frame = _as_frame(returns)
+    x = frame.to_numpy(dtype=float)
+    valid = ~np.isnan(x)
+
+    # Centre each column first to keep the sum-of-squares update numerically stable
+    x = np.where(valid, x - np.nanmean(x, axis=0), 0.0)
+    zeros = np.zeros((1, x.shape[1]))
+    s1 = np.vstack([zeros, np.cumsum(x, axis=0)])
+    s2 = np.vstack([zeros, np.cumsum(x * x, axis=0)])
+    n = np.vstack([zeros, np.cumsum(valid, axis=0)])
+
+    count = n[window:] - n[:-window]
+    total = s1[window:] - s1[:-window]
+    total_sq = s2[window:] - s2[:-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (total_sq - total * total / count) / (count - 1)
+    variance = np.where(count > 1, np.maximum(variance, 0.0), np.nan)
+
+    volatility = np.full(x.shape, np.nan)
+    volatility[window - 1:] = np.sqrt(variance * periods_per_year)
+    result = pd.DataFrame(volatility, index=frame.index, columns=frame.columns)
+    return result.iloc[:, 0] if isinstance(returns, pd.Series) else result
+
+
+def historical_var_cvar(returns, confidence=0.95):
+    """Historical VaR and CVaR (expected shortfall) per portfolio, reported as positive losses."""
+    frame = _as_frame(returns)
+    x = frame.to_numpy(dtype=float)
+    cutoff = np.nanquantile(x, 1 - confidence, axis=0)
+    tail = np.where(x <= cutoff, x, np.nan)
+    return pd.DataFrame({"VaR": -cutoff, "CVaR": -np.nanmean(tail, axis=0)}, index=frame.columns)
+
+
+def parametric_var_cvar(returns, confidence=0.95):
+    """Gaussian VaR and CVaR per portfolio from the mean and standard deviation of returns."""
+    frame = _as_frame(returns)
+    mu = frame.mean().to_numpy()
+    sigma = frame.std().to_numpy()
+    z = norm.ppf(1 - confidence)
+    var = -(mu + z * sigma)
+    cvar = -(mu - sigma * norm.pdf(z) / (1 - confidence))
+    return pd.DataFrame({"VaR": var, "CVaR": cvar}, index=frame.columns)
+
+
+def beta(returns, benchmark_returns):
+    """Beta of each portfolio to each benchmark over their common dates (portfolios x benchmarks)."""
+    frame = _as_frame(returns)
+    benchmarks = _as_frame(benchmark_returns)
+    common = frame.index.intersection(benchmarks.index)
+    x = frame.loc[common].to_numpy(dtype=float)
+    b = benchmarks.loc[common].to_numpy(dtype=float)
+    complete = ~(np.isnan(x).any(axis=1) | np.isnan(b).any(axis=1))
+    x, b = x[complete], b[complete]
+    x = x - x.mean(axis=0)
+    b = b - b.mean(axis=0)
+    return pd.DataFrame((x.T @ b) / (b * b).sum(axis=0), index=frame.columns, columns=benchmarks.columns)
+
+
+def max_drawdown(returns):
+    """Maximum drawdown per portfolio with its peak, trough, recovery date and duration in periods.
+
+    Wealth starts at 1.0 before the first return, so a loss on the first bar counts. That starting
+    point is labelled with the first date. Duration runs from the peak to the recovery of that
+    peak, or to the last date if it never recovered.
+    """
+    frame = _as_frame(returns)
+    x = np.nan_to_num(frame.to_numpy(dtype=float))
+    wealth = np.vstack([np.ones((1, x.shape[1])), np.cumprod(1 + x, axis=0)])
+    running_peak = np.maximum.accumulate(wealth, axis=0)
+    drawdown = wealth / running_peak - 1
+
+    cols = np.arange(x.shape[1])
+    trough = drawdown.argmin(axis=0)
+    steps = np.arange(len(wealth))[:, None]
+
+    # Peak: last new high at or before the trough; recovery: first time after the trough the peak is regained
+    peak = np.where((steps <= trough) & (wealth >= running_peak), steps, -1).max(axis=0)
+    peak_value = wealth[peak, cols]
+    recovered = (steps > trough) & (wealth >= peak_value)
+    has_recovered = recovered.any(axis=0)
+    recovery = np.where(has_recovered, recovered.argmax(axis=0), len(wealth) - 1)
+
+    dates = frame.index[np.maximum(np.arange(len(wealth)) - 1, 0)]  # Step k is the close after the k-th return
+    return pd.DataFrame({
+        "Max Drawdown": drawdown[trough, cols],
+        "Peak": dates[peak],
+        "Trough": dates[trough],
+        "Recovery": dates[recovery].where(has_recovered),
+        "Duration": recovery - peak
+    }, index=frame.columns)
+
+
+def risk_report(returns, benchmark_returns=None, confidence=0.95, periods_per_year=52):
+    """One row of risk metrics per portfolio: volatility, VaR/CVaR, max drawdown and benchmark betas."""
+    frame = _as_frame(returns)
+    historical = historical_var_cvar(frame, confidence)
+    parametric = parametric_var_cvar(frame, confidence)
+    drawdown = max_drawdown(frame)
+
+    report = pd.DataFrame({
+        "Volatility": frame.std() * np.sqrt(periods_per_year),
+        "Historical VaR": historical["VaR"],
+        "Historical CVaR": historical["CVaR"],
+        "Parametric VaR": parametric["VaR"],
+        "Parametric CVaR": parametric["CVaR"],
+        "Max Drawdown": drawdown["Max Drawdown"],
+        "Drawdown Duration": drawdown["Duration"]
+    })
+    if benchmark_returns is not None:
+        report = report.join(beta(frame, benchmark_returns).add_prefix("Beta "))
+    return report
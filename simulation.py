@@ -0,0 +1,152 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from panel import as_panel
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+MOMENTS_CACHE_SIZE = int(os.getenv("MOMENTS_CACHE_SIZE", 16))  # Universes kept, least recently used dropped
+
+_MOMENTS_CACHE = OrderedDict()
+_MOMENTS_LOCK = threading.Lock()
+
+def estimate_return_moments(prices):
+    """Returns the per-period mean vector and covariance matrix of log returns, cached while the data is unchanged."""
+    panel = as_panel(prices)
+    with _MOMENTS_LOCK:
+        moments = _MOMENTS_CACHE.get(panel.key)
+        if moments is not None:
+            _MOMENTS_CACHE.move_to_end(panel.key)
+            return moments
+
+    log_returns = panel.log_returns.astype(float)
+    moments = (log_returns.mean(), log_returns.cov())
+    with _MOMENTS_LOCK:
+        _MOMENTS_CACHE[panel.key] = moments
+        while len(_MOMENTS_CACHE) > MOMENTS_CACHE_SIZE:
+            _MOMENTS_CACHE.popitem(last=False)
+    return moments
+
+def _bin_edges(weights, mean, covariance, horizon, bins, z_max=6.0):
+    """Builds per-step histogram ranges for log growth, centred on the portfolio drift and widening with sqrt(t)."""
+    steps = np.arange(1, horizon + 1)
+    mu = float(weights @ mean)
+    sigma = max(float(np.sqrt(weights @ covariance @ weights)), 1e-8)
+    low = mu * steps - z_max * sigma * np.sqrt(steps)
+    width = 2 * z_max * sigma * np.sqrt(steps) / bins
+    return low, width
+
+def _simulate_chunk(args):
+    """Simulates one batch of correlated paths and reduces it to per-step histograms and loss counts."""
+    weights, mean, chol, horizon, n_paths, seed, low, width, bins = args
+    rng = np.random.default_rng(seed)
+
+    # Correlated log returns: (paths, steps, assets)
+    shocks = rng.standard_normal((n_paths, horizon, len(mean)))
+    log_returns = mean + shocks @ chol.T
+
+    # Buy-and-hold growth of $1 split by the portfolio weights
+    growth = np.exp(np.cumsum(log_returns, axis=1)) @ weights
+    log_growth = np.log(growth)
+
+    bin_idx = np.clip(((log_growth - low) / width).astype(np.int64), 0, bins - 1)
+    flat_idx = bin_idx + np.arange(horizon) * bins
+    counts = np.bincount(flat_idx.ravel(), minlength=horizon * bins).reshape(horizon, bins)
+
+    loss_counts = (growth < 1.0).sum(axis=0)
+    terminal_sum = growth[:, -1].sum()
+    return counts, loss_counts, terminal_sum
+
+def _histogram_percentiles(counts, low, width, percentiles):
+    """Reads percentiles of log growth off cumulative per-step histograms, interpolating inside each bin."""
+    cdf = np.cumsum(counts, axis=1) / counts.sum(axis=1, keepdims=True)
+    result = np.empty((counts.shape[0], len(percentiles)))
+    for j, p in enumerate(percentiles):
+        target = p / 100
+        idx = np.minimum((cdf < target).sum(axis=1), counts.shape[1] - 1)
+        rows = np.arange(counts.shape[0])
+        prev_cdf = np.where(idx > 0, cdf[rows, np.maximum(idx - 1, 0)], 0.0)
+        bin_mass = np.maximum(cdf[rows, idx] - prev_cdf, 1e-12)
+        fraction = np.clip((target - prev_cdf) / bin_mass, 0.0, 1.0)
+        result[:, j] = low + (idx + fraction) * width
+    return result
+
+def simulate_portfolio_paths(weights, mean, covariance, initial_value=1.0, horizon=52, n_paths=20000,
+                             chunk_size=1000, seed=42, percentiles=PERCENTILES, n_workers=1, bins=512):
+    """Monte Carlo projection of portfolio value from per-period mean/covariance of log returns.
+
+    Paths are simulated in chunks of ``chunk_size`` and reduced to fixed-size histograms, so memory
+    stays bounded regardless of ``n_paths``. Every chunk gets its own child of ``seed``, which keeps
+    results identical whether chunks run in-process or across ``n_workers`` processes.
+    """
+    tickers = list(weights.index)
+    w = weights.to_numpy(dtype=float)
+    mu = mean.reindex(tickers).fillna(0).to_numpy(dtype=float)
+    cov = covariance.reindex(index=tickers, columns=tickers).fillna(0).to_numpy(dtype=float)
+
+    # Cholesky factor for correlated draws (jitter keeps near-singular matrices factorizable)
+    jitter = 1e-12 * np.eye(len(tickers))
+    chol = np.linalg.cholesky(cov + jitter)
+
+    low, width = _bin_edges(w, mu, cov, horizon, bins)
+    chunk_sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        chunk_sizes.append(n_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(w, mu, chol, horizon, size, s, low, width, bins) for size, s in zip(chunk_sizes, seeds)]
+
+    counts = np.zeros((horizon, bins), dtype=np.int64)
+    loss_counts = np.zeros(horizon, dtype=np.int64)
+    terminal_sum = 0.0
+
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = pool.map(_simulate_chunk, tasks)
+            for chunk_counts, chunk_losses, chunk_terminal in results:
+                counts += chunk_counts
+                loss_counts += chunk_losses
+                terminal_sum += chunk_terminal
+    else:
+        for task in tasks:
+            chunk_counts, chunk_losses, chunk_terminal = _simulate_chunk(task)
+            counts += chunk_counts
+            loss_counts += chunk_losses
+            terminal_sum += chunk_terminal
+
+    log_bands = _histogram_percentiles(counts, low, width, percentiles)
+    steps = pd.RangeIndex(0, horizon + 1, name="Step")
+    bands = pd.DataFrame(
+        np.vstack([np.zeros(len(percentiles)), log_bands]),
+        index=steps,
+        columns=[f"P{p}" for p in percentiles]
+    )
+    bands = initial_value * np.exp(bands)
+
+    prob_loss = pd.Series(np.concatenate([[0.0], loss_counts / n_paths]), index=steps, name="Probability of Loss")
+
+    return {
+        "bands": bands,
+        "prob_loss": prob_loss,
+        "prob_loss_final": float(prob_loss.iloc[-1]),
+        "expected_value": initial_value * terminal_sum / n_paths,
+        "n_paths": n_paths
+    }
+
+def project_portfolio(portfolio_df, prices, horizon=52, n_paths=20000, **kwargs):
+    """Runs the Monte Carlo projection for a portfolio table (Ticker/Allocation/Investment ($)) over price history."""
+    if portfolio_df.empty or prices.empty:
+        return None
+
+    weights = portfolio_df.set_index("Ticker")["Allocation"]
+    panel = as_panel(prices)
+    weights = weights[weights.index.isin(panel.tickers) & (weights > 0)]
+    if weights.empty:
+        return None
+    weights = weights / weights.sum()
+
+    mean, covariance = estimate_return_moments(panel)
+    initial_value = portfolio_df["Investment ($)"].sum()
+    return simulate_portfolio_paths(weights, mean, covariance, initial_value, horizon=horizon, n_paths=n_paths, **kwargs)
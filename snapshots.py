@@ -0,0 +1,141 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import db
+from panel import PricePanel
+
+MAX_VERSIONS = int(os.getenv("SNAPSHOT_MAX_VERSIONS", 3))  # Versions kept per store; older ones are dropped
+MAX_STORES = int(os.getenv("SNAPSHOT_MAX_STORES", 16))  # Universes/windows kept, least recently loaded dropped
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR")  # Where versions are saved; unset keeps them in process memory only
+
+
+class SnapshotStore:
+    """Versioned price history with cheap point-in-time views.
+
+    Each commit that changes the data becomes a new immutable version (a read-only
+    PricePanel). ``as_of`` returns a row-sliced view of a version, so any number of
+    historical dates can be evaluated without copying the price arrays. Only the latest
+    ``max_versions`` are held in memory; version numbers keep counting up as older ones are
+    dropped. With a ``path``, every version is also saved there and reloaded on demand, so
+    version numbers and their data survive a restart; without one they are in-memory only.
+    """
+
+    def __init__(self, max_versions=MAX_VERSIONS, path=None):
+        self.versions = []
+        self.max_versions = max_versions
+        self.first_version = 0  # Number of the oldest version still held
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            saved = [int(name[1:-4]) for name in os.listdir(path) if name.startswith("v") and name.endswith(".npz")]
+            if saved:
+                self.first_version = max(saved)
+                self.versions.append({"panel": self._load(self.first_version)})
+
+    @property
+    def latest_version(self):
+        """Number of the newest version (None before the first commit)."""
+        return self.first_version + len(self.versions) - 1 if self.versions else None
+
+    def _file(self, version):
+        return os.path.join(self.path, f"v{version}.npz")
+
+    def _save(self, version, panel):
+        np.savez(self._file(version), values=panel.values, dates=panel.dates.to_numpy(), tickers=np.asarray(panel.tickers, dtype=str))
+
+    def _load(self, version):
+        with np.load(self._file(version)) as data:
+            return PricePanel(data["values"], pd.DatetimeIndex(data["dates"]), data["tickers"])
+
+    def commit(self, prices):
+        """Stores the prices as a new version unless they match the latest one; returns the version number."""
+        panel = PricePanel.from_frame(prices)
+        with self._lock:
+            if self.versions:
+                latest = self.versions[-1]["panel"]
+                unchanged = (
+                    latest.values.shape == panel.values.shape
+                    and latest.dates.equals(panel.dates)
+                    and latest.tickers.equals(panel.tickers)
+                    and np.array_equal(latest.values, panel.values, equal_nan=True)
+                )
+                if unchanged:
+                    return self.latest_version
+            version = self.first_version + len(self.versions) if self.versions else self.first_version
+            if self.path is not None:
+                self._save(version, panel)
+            self.versions.append({"panel": panel, "committed_at": pd.Timestamp.now()})
+            while len(self.versions) > self.max_versions:
+                self.versions.pop(0)
+                self.first_version += 1
+            return version
+
+    def as_of(self, date, version=None):
+        """Read-only view of the history known up to ``date`` in the given version (latest by default)."""
+        if not self.versions:
+            raise ValueError("No snapshot has been committed yet.")
+        if version is None or self.first_version <= version <= self.latest_version:
+            panel = self.versions[-1 if version is None else version - self.first_version]["panel"]
+        elif self.path is not None and 0 <= version < self.first_version and os.path.exists(self._file(version)):
+            panel = self._load(version)
+        else:
+            raise KeyError(f"Snapshot version {version} is not available (oldest held is {self.first_version}).")
+        return panel.truncate(date)
+
+    def as_of_many(self, dates, version=None):
+        """Point-in-time views for many dates, all sharing one version's arrays."""
+        return {date: self.as_of(date, version) for date in dates}
+
+    def nbytes(self):
+        """Bytes held by the kept versions' price arrays."""
+        with self._lock:
+            return sum(entry["panel"].values.nbytes for entry in self.versions)
+
+
+_STORES = OrderedDict()
+_STORES_LOCK = threading.Lock()
+
+
+def _store_path(key):
+    """Directory holding one store's saved versions (None when snapshots are in-memory only)."""
+    if SNAPSHOT_DIR is None:
+        return None
+    return os.path.join(SNAPSHOT_DIR, hashlib.sha1(repr(key).encode()).hexdigest()[:16])
+
+
+def load_snapshot(tickers, start, end=None, interval="1wk", refresh=False):
+    """Snapshot store for a universe and history window.
+
+    The latest download is committed as a version only when the store has none yet or
+    ``refresh`` is set, so repeated loads keep reading the version already in use.
+    """
+    key = (tuple(sorted(tickers)), start, end, interval)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = SnapshotStore(path=_store_path(key))
+        _STORES.move_to_end(key)
+        while len(_STORES) > MAX_STORES:
+            _STORES.popitem(last=False)
+
+    if refresh or store.latest_version is None:
+        prices = db.fetch_stock_data(tickers, start=start, end=end, interval=interval)
+        if not prices.empty:
+            store.commit(prices)
+    return store
+
+
+def snapshot_usage():
+    """Stores, versions and bytes held by all snapshot stores."""
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+    return {
+        "stores": len(stores),
+        "versions": sum(len(store.versions) for store in stores),
+        "bytes": sum(store.nbytes() for store in stores)
+    }
@@ -0,0 +1,184 @@
+import logging
+import numpy as np
+import pandas as pd
+import db
+from panel import PricePanel, as_panel
+
+# Historical shock windows: market peak to trough
+SCENARIOS = {
+    "Global Financial Crisis": ("2007-10-09", "2009-03-09"),
+    "COVID Crash": ("2020-02-19", "2020-03-23"),
+    "2022 Rate Shock": ("2022-01-03", "2022-10-12")
+}
+HISTORY_START = "2007-01-01"
+MIN_BETA_OBSERVATIONS = 52
+
+logger = logging.getLogger(__name__)
+
+
+def _weight_matrix(weights, tickers):
+    """Portfolios x tickers weight array plus the portfolio labels (a Series is one portfolio)."""
+    frame = weights.to_frame("Portfolio").T if isinstance(weights, pd.Series) else weights
+    return frame.reindex(columns=tickers).fillna(0).to_numpy(dtype=float), frame.index
+
+
+def historical_stress(panel, weights, scenarios=SCENARIOS):
+    """Loss, drawdown and recovery of one or many portfolios over each historical shock window.
+
+    Portfolio returns come from one (dates x tickers) @ (tickers x portfolios) product over the
+    shared return matrix, accumulated once as log wealth; each scenario is then a row slice of
+    that array. Recovery counts bars from the trough until the pre-drawdown peak is regained,
+    searching through the end of the history (NaN if it never was). Coverage is the share of
+    each portfolio's weight priced at the scenario start; unpriced holdings count as cash.
+    """
+    w, labels = _weight_matrix(weights, panel.tickers)
+    returns = np.nan_to_num(panel.returns.to_numpy(dtype=float))
+    log_wealth = np.vstack([np.zeros((1, len(w))), np.cumsum(np.log1p(returns @ w.T), axis=0)])
+    cols = np.arange(len(w))
+
+    results = []
+    for name, (start, end) in scenarios.items():
+        s = max(panel.dates.searchsorted(pd.Timestamp(start), side="right") - 1, 0)
+        e = panel.dates.searchsorted(pd.Timestamp(end), side="right") - 1
+        if e <= s:
+            continue  # Window falls outside the price history
+
+        path = log_wealth[s:] - log_wealth[s]
+        window = path[:e - s + 1]
+        running_peak = np.maximum.accumulate(window, axis=0)
+        drawdown = np.expm1(window - running_peak)
+        trough = drawdown.argmin(axis=0)
+        peak_level = running_peak[trough, cols]
+
+        steps = np.arange(len(path))[:, None]
+        recovered = (steps > trough) & (path >= peak_level - 1e-12)
+        has_recovered = recovered.any(axis=0) | (drawdown[trough, cols] == 0)
+        recovery = np.where(drawdown[trough, cols] == 0, trough, recovered.argmax(axis=0))
+        recovery_dates = panel.dates[np.minimum(s + recovery, len(panel.dates) - 1)]
+
+        results.append(pd.DataFrame({
+            "Scenario": name,
+            "Loss": -np.expm1(window[-1]),
+            "Max Drawdown": drawdown[trough, cols],
+            "Trough": panel.dates[s + trough],
+            "Recovery": recovery_dates.where(has_recovered),
+            "Recovery (periods)": np.where(has_recovered, recovery - trough, np.nan),
+            "Coverage": w @ panel.mask[s]
+        }, index=labels))
+
+    if not results:
+        return pd.DataFrame()
+    return pd.concat(results).rename_axis("Portfolio").set_index("Scenario", append=True)
+
+
+def factor_betas(panel, factor_panel, factors=None):
+    """Per-ticker regression betas on the named factor returns (tickers x factors), with an intercept.
+
+    Each ticker is fitted over the bars where it and every factor are priced; tickers with fewer
+    than MIN_BETA_OBSERVATIONS such bars get NaN betas.
+    """
+    factor_returns = factor_panel.returns if factors is None else factor_panel.returns[list(factors)]
+    common = panel.dates[1:].intersection(factor_returns.index)
+    r = panel.returns.loc[common].to_numpy(dtype=float)
+    f = factor_returns.loc[common].to_numpy(dtype=float)
+
+    valid = ~np.isnan(r) & ~np.isnan(f).any(axis=1, keepdims=True)
+    design = np.hstack([np.ones((len(f), 1)), np.nan_to_num(f)])
+
+    # Batched normal equations: one small (factors + 1) system per ticker over its valid bars
+    gram = np.einsum("tn,tk,tl->nkl", valid, design, design)
+    moment = np.einsum("tn,tk->nk", np.where(valid, r, 0.0), design)
+    enough = valid.sum(axis=0) >= MIN_BETA_OBSERVATIONS
+    coefficients = np.full(moment.shape, np.nan)
+    if enough.any():
+        coefficients[enough] = np.linalg.solve(gram[enough], moment[enough][..., None])[..., 0]
+    return pd.DataFrame(coefficients[:, 1:], index=panel.tickers, columns=factor_returns.columns)
+
+
+def factor_stress(panel, weights, factor_panel, factor_shocks):
+    """Loss of one or many portfolios under user-defined factor shocks mapped through ticker betas.
+
+    ``factor_shocks`` maps a scenario name to factor moves, e.g. {"Tech selloff": {"Nasdaq-100": -0.3}}.
+    Betas are estimated on the factors each scenario names, so unnamed factors are not assumed flat.
+    Coverage is the share of weight in tickers with enough history for a beta.
+    """
+    w, labels = _weight_matrix(weights, panel.tickers)
+
+    results = []
+    for name, shocks in factor_shocks.items():
+        shocks = {factor: move for factor, move in shocks.items() if factor in factor_panel.tickers}
+        if not shocks:
+            continue
+        betas = factor_betas(panel, factor_panel, shocks.keys())
+        impact = betas.to_numpy() @ pd.Series(shocks)[betas.columns].to_numpy(dtype=float)
+        has_beta = ~np.isnan(impact)
+        results.append(pd.DataFrame({
+            "Scenario": name,
+            "Loss": -(w @ np.where(has_beta, impact, 0.0)),
+            "Coverage": w @ has_beta
+        }, index=labels))
+
+    if not results:
+        return pd.DataFrame()
+    return pd.concat(results).rename_axis("Portfolio").set_index("Scenario", append=True)
+
+
+def fetch_stress_panels(tickers, start=HISTORY_START, interval="1d"):
+    """Shared price panel for the tickers and the benchmark factor panel over the full scenario history."""
+    from backtesting import BENCHMARK_INDICES
+
+    panel = db.fetch_price_panel(tickers, start=start, interval=interval)
+    factors = db.fetch_price_panel(list(BENCHMARK_INDICES.values()), start=start, interval=interval)
+    empty = PricePanel.from_frame(pd.DataFrame())
+    if factors is not None:
+        names = {ticker: name for name, ticker in BENCHMARK_INDICES.items()}
+        factors = PricePanel(factors.values, factors.dates, [names.get(t, t) for t in factors.tickers])
+    return panel if panel is not None else empty, factors if factors is not None else empty
+
+
+def stress_test(weights, panel=None, factor_panel=None, scenarios=SCENARIOS, factor_shocks=None, interval="1d"):
+    """Historical and factor-shock stress results for one or many portfolios, one row per (portfolio, scenario)."""
+    if panel is None:
+        tickers = list(weights.index if isinstance(weights, pd.Series) else weights.columns)
+        panel, fetched_factors = fetch_stress_panels(tickers, interval=interval)
+        factor_panel = factor_panel if factor_panel is not None else fetched_factors
+    panel = as_panel(panel)
+    if panel.empty:
+        logger.warning("No price history available for stress testing.")
+        return pd.DataFrame()
+
+    results = [historical_stress(panel, weights, scenarios)]
+    if factor_shocks and factor_panel is not None and not factor_panel.empty:
+        results.append(factor_stress(panel, weights, as_panel(factor_panel), factor_shocks))
+    results = [r for r in results if not r.empty]
+    return pd.concat(results) if results else pd.DataFrame()
+
+
+def run_stress_job(client=None, universe=None, page_size=None, scenarios=SCENARIOS, factor_shocks=None,
+                   interval="1d"):
+    """Stress-tests every saved portfolio against the scenario set, one shared return matrix for all pages."""
+    from rebalance import PAGE_SIZE, get_firestore_client, stream_portfolio_pages, _page_to_matrices
+
+    client = client or get_firestore_client()
+    if universe is None:
+        from portfolio import get_stocks_from_selected_sectors
+        universe = get_stocks_from_selected_sectors([])
+
+    panel, factor_panel = fetch_stress_panels(universe, interval=interval)
+    if panel.empty:
+        logger.warning("No price data available for the stress job.")
+        return pd.DataFrame()
+    tickers = list(panel.tickers)
+
+    results = []
+    for page in stream_portfolio_pages(client, page_size or PAGE_SIZE):
+        targets, _, _ = _page_to_matrices(page, tickers)
+        weights = pd.DataFrame(targets, index=[doc.id for doc in page], columns=tickers)
+        results.append(stress_test(weights, panel, factor_panel, scenarios, factor_shocks))
+
+    return pd.concat(results) if results else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Stress results:\n%s", run_stress_job())
@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+from api import app
+
+client = TestClient(app)
+
+
+def test_unknown_allocation_method_is_rejected():
+    response = client.post("/portfolio", json={"investment_amount": 10000, "allocation_method": "bogus"})
+    assert response.status_code == 422
+
+
+def test_unknown_risk_tolerance_is_rejected():
+    response = client.post("/portfolio", json={"investment_amount": 10000, "risk_tolerance": "Extreme"})
+    assert response.status_code == 422
+
+
+def test_unknown_model_type_is_rejected():
+    response = client.post("/forecast", json={"tickers": ["AAPL"], "model_type": "GARCH"})
+    assert response.status_code == 422
+
+
+def test_runner_fetches_once_in_process_and_passes_data_to_the_pool():
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from api import JobRunner
+
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return ("prices",)
+
+    async def scenario():
+        runner = JobRunner(ThreadPoolExecutor(2), max_concurrency=2)
+        return await asyncio.gather(*[
+            runner.run(("job", 1), lambda x, data: (x, data), 1, fetch=fetch) for _ in range(5)
+        ])
+
+    assert asyncio.run(scenario()) == [(1, "prices")] * 5
+    assert len(fetches) == 1
+
+
+def test_risk_job_uses_the_supplied_prices():
+    import numpy as np
+    import pandas as pd
+    from api import _risk_job
+
+    dates = pd.date_range("2022-01-07", periods=60, freq="W-FRI")
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (60, 2)), axis=0)), index=dates, columns=["AAA", "BBB"])
+    benchmarks = pd.DataFrame({"S&P 500": prices.mean(axis=1)})
+
+    report = _risk_job([[{"Ticker": "AAA", "Allocation": 0.5}, {"Ticker": "BBB", "Allocation": 0.5}]], "3y", prices, benchmarks)
+    assert len(report) == 1
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import arima_orders
+from arima_orders import select_arima_orders
+from arima_state import incremental_arima_forecast, reset_arima_state
+
+CANDIDATES = [(0, 1, 0), (1, 1, 0), (0, 1, 1)]
+
+
+def _series(seed, n=120):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2021-01-01", periods=n, freq="W-FRI")
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0.001, 0.02, n))), index=dates)
+
+
+def test_search_returns_full_history_params_and_caches_orders(monkeypatch):
+    monkeypatch.setattr(arima_orders, "_ORDER_CACHE", {})
+    series = {"AAA": _series(0), "BBB": _series(1)}
+
+    orders, params = select_arima_orders(series, candidates=CANDIDATES, n_workers=1, return_params=True)
+    assert set(orders) == set(params) == {"AAA", "BBB"}
+
+    # Unchanged histories reuse the cached orders without searching (so no fresh params)
+    again, fresh = select_arima_orders(series, candidates=CANDIDATES, n_workers=1, return_params=True)
+    assert again == orders and fresh == {}
+
+
+def test_incremental_forecast_filters_with_searched_params(monkeypatch):
+    monkeypatch.setattr(arima_orders, "_ORDER_CACHE", {})
+    import arima_state
+    fits = []
+    monkeypatch.setattr(arima_state, "_fit", lambda values, order: fits.append(order))
+    reset_arima_state()
+
+    prices = _series(2)
+    orders, params = select_arima_orders({"AAA": prices}, candidates=CANDIDATES, n_workers=1, return_params=True)
+    forecast = incremental_arima_forecast("AAA", prices, orders["AAA"], params=params["AAA"])
+
+    assert fits == [] and np.isfinite(forecast)
+    reset_arima_state()
+
+
+def test_pooled_search_matches_serial_and_avoids_fork(monkeypatch):
+    monkeypatch.setattr(arima_orders, "_ORDER_CACHE", {})
+    series = {"AAA": _series(3), "BBB": _series(4)}
+    serial = select_arima_orders(series, candidates=CANDIDATES, n_workers=1)
+
+    monkeypatch.setattr(arima_orders, "_ORDER_CACHE", {})
+    pooled = select_arima_orders(series, candidates=CANDIDATES, n_workers=2)
+
+    assert pooled == serial
+    assert arima_orders._POOL._mp_context.get_start_method() != "fork"
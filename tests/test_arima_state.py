@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import arima_state
+from arima_state import incremental_arima_forecast, reset_arima_state
+from db import resample_prices
+
+
+def _rolling_weekly_view(daily, as_of, years=3):
+    """The live pipeline's view: the trailing window of daily bars, resampled to weeks (last week partial)."""
+    window = daily[(daily.index > as_of - pd.DateOffset(years=years)) & (daily.index <= as_of)]
+    return resample_prices(window.to_frame(), "1wk").iloc[:, 0]
+
+
+def test_daily_refreshes_of_rolling_weekly_view_do_not_refit(monkeypatch):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2020-01-01", "2024-06-28")
+    daily = pd.Series(100 * np.exp(np.cumsum(rng.normal(0.0005, 0.01, len(dates)))), index=dates, name="AAA")
+
+    fits = []
+    original_fit = arima_state._fit
+    monkeypatch.setattr(arima_state, "_fit", lambda values, order: fits.append(len(values)) or original_fit(values, order))
+    reset_arima_state()
+
+    for as_of in pd.bdate_range("2024-06-03", periods=10):
+        incremental_arima_forecast("AAA", _rolling_weekly_view(daily, as_of), (1, 1, 0))
+
+    assert len(fits) == 1
+    reset_arima_state()
+
+
+def test_changed_history_forces_refit(monkeypatch):
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("2021-01-01", periods=120, freq="W-FRI")
+    prices = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, 120))), index=dates)
+
+    fits = []
+    original_fit = arima_state._fit
+    monkeypatch.setattr(arima_state, "_fit", lambda values, order: fits.append(len(values)) or original_fit(values, order))
+    reset_arima_state()
+
+    incremental_arima_forecast("BBB", prices, (1, 1, 0))
+    revised = prices.copy()
+    revised.iloc[-3] *= 1.1
+    incremental_arima_forecast("BBB", revised, (1, 1, 0))
+
+    assert len(fits) == 2
+    reset_arima_state()
+
+
+def test_updates_do_not_mutate_the_stored_residuals():
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("2021-01-01", periods=110, freq="W-FRI")
+    prices = pd.Series(100 * np.exp(np.cumsum(rng.normal(0.001, 0.02, len(dates)))), index=dates)
+    reset_arima_state()
+
+    incremental_arima_forecast("AAA", prices.iloc[:100], (1, 1, 0))
+    shared = arima_state._MODEL_STATE["AAA"]["residuals"]
+    incremental_arima_forecast("AAA", prices.iloc[:104], (1, 1, 0))
+
+    assert len(shared) == 0
+    assert len(arima_state._MODEL_STATE["AAA"]["residuals"]) == 4
+    reset_arima_state()
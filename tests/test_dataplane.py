@@ -0,0 +1,58 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import db
+import dataplane
+from dataplane import DataPlane
+from panel import PricePanel
+
+
+def _panel(n=100):
+    dates = pd.bdate_range("2024-01-01", periods=n)
+    return PricePanel.from_frame(pd.DataFrame(np.ones((n, 2)), index=dates, columns=["AAA", "BBB"]))
+
+
+def test_concurrent_sessions_share_one_load():
+    plane = DataPlane()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return _panel()
+
+    threads = [threading.Thread(target=plane.get, args=("k", loader, session)) for session in range(8)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+
+    assert len(loads) == 1
+    metrics = plane.metrics()
+    assert metrics["sessions"] == 8 and metrics["pinned"] == 1
+
+
+def test_pinned_values_survive_eviction_until_released():
+    plane = DataPlane(budget_mb=0.001)
+    plane.get("pinned", _panel, session="s1", slot="prices")
+    plane.get("other", _panel)
+    assert "pinned" in plane._entries and "other" not in plane._entries
+
+    plane.release("s1")
+    plane.get("newer", _panel)
+    assert "pinned" not in plane._entries
+
+
+def test_shared_prices_moves_to_new_version_on_refresh(monkeypatch):
+    monkeypatch.setattr(dataplane, "_DATA_PLANE", DataPlane())
+    versions = iter([_panel(100), _panel(101)])
+    monkeypatch.setattr(db, "fetch_price_panel", lambda *args, **kwargs: next(versions))
+    epoch = [1]
+    monkeypatch.setattr(db, "data_version", lambda end=None: epoch[0])
+
+    first = dataplane.shared_prices(["AAA", "BBB"], session="s1")
+    assert dataplane.shared_prices(["AAA", "BBB"], session="s1") is first
+
+    epoch[0] = 2
+    second = dataplane.shared_prices(["AAA", "BBB"], session="s1")
+    assert len(second) == 101 and second.key != first.key
+    assert dataplane.get_data_plane().metrics()["pinned"] == 1
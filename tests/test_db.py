@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+import db
+from downloader import DownloadScheduler, set_scheduler
+
+
+@pytest.fixture
+def fake_downloads(monkeypatch):
+    """Routes downloads to an in-memory provider and a fresh price store, recording each request."""
+    calls = []
+
+    def provider(tickers, **params):
+        calls.append((tuple(tickers), params))
+        dates = pd.bdate_range("2024-01-01", periods=30)
+        return pd.DataFrame(np.linspace(1, 2, 30)[:, None].repeat(len(tickers), axis=1), index=dates, columns=tickers)
+
+    monkeypatch.setattr(db, "_PRICE_STORE", db.PriceStore())
+    set_scheduler(DownloadScheduler(provider=provider, rate_per_second=1000, base_delay=0))
+    yield calls
+    set_scheduler(None)
+
+
+def test_relative_period_is_refetched_after_refresh_epoch(fake_downloads, monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(db.time, "time", lambda: clock[0])
+
+    db.fetch_stock_data(["AAA", "BBB"])
+    db.fetch_stock_data(["AAA", "BBB"])
+    assert len(fake_downloads) == 1
+
+    clock[0] += db.REFRESH_SECONDS
+    db.fetch_stock_data(["AAA", "BBB"])
+    assert len(fake_downloads) == 2
+
+
+def test_fixed_window_is_cached_indefinitely(fake_downloads, monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(db.time, "time", lambda: clock[0])
+
+    db.fetch_stock_data(["AAA"], start="2020-01-01", end="2021-01-01")
+    clock[0] += 10 * db.REFRESH_SECONDS
+    db.fetch_stock_data(["AAA"], start="2020-01-01", end="2021-01-01")
+    assert len(fake_downloads) == 1
+
+
+def test_price_store_counts_cached_derivatives():
+    store = db.PriceStore(budget_mb=0.8)
+    dates = pd.bdate_range("2020-01-01", periods=10_000)
+    panel = store.put("a", db.to_compact(pd.DataFrame(np.ones((10_000, 4)), index=dates)))
+    before = store.usage()["bytes"]
+
+    panel.returns, panel.log_returns, panel.normalized
+    assert store.usage()["bytes"] == before + 3 * panel.values.nbytes - panel.values[0].nbytes * 2
+
+    # The next put sees the grown panel and evicts it to stay within budget
+    store.put("b", db.to_compact(pd.DataFrame(np.ones((10_000, 4)), index=dates)))
+    assert store.get("a") is None
+    assert store.usage()["bytes"] <= store.budget_bytes
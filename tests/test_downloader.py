@@ -0,0 +1,90 @@
+import threading
+import time
+import pandas as pd
+import pytest
+from downloader import DownloadScheduler
+
+
+def _close(tickers, n=5):
+    dates = pd.bdate_range("2024-01-01", periods=n)
+    return pd.DataFrame({ticker: range(1, n + 1) for ticker in tickers}, index=dates, dtype=float)
+
+
+class FakeProvider:
+    """Local stand-in for Yahoo: records requests, can throttle the first calls or omit tickers."""
+
+    def __init__(self, throttled_calls=0, missing=(), delay=0.0):
+        self.calls = []
+        self.throttled_calls = throttled_calls
+        self.missing = set(missing)
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, tickers, **params):
+        with self.lock:
+            self.calls.append(list(tickers))
+            throttled = len(self.calls) <= self.throttled_calls
+        time.sleep(self.delay)
+        if throttled:
+            raise ValueError("Yahoo Finance returned no data")
+        return _close([t for t in tickers if t not in self.missing])
+
+
+def _scheduler(provider, **kwargs):
+    return DownloadScheduler(provider=provider, rate_per_second=1000, base_delay=0, **kwargs)
+
+
+def test_concurrent_requests_for_the_same_tickers_share_one_fetch():
+    provider = FakeProvider(delay=0.05)
+    scheduler = _scheduler(provider)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(scheduler.download(["AAA", "BBB"], period="1y")))
+               for _ in range(6)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+
+    assert len(provider.calls) == 1
+    assert scheduler.stats["coalesced"] == 10
+    assert all(list(df.columns) == ["AAA", "BBB"] for df in results)
+
+
+def test_throttled_responses_are_retried_with_backoff():
+    provider = FakeProvider(throttled_calls=2)
+    scheduler = _scheduler(provider)
+
+    df = scheduler.download(["AAA"], period="1y")
+
+    assert list(df.columns) == ["AAA"]
+    assert scheduler.stats["requests"] == 3
+    assert scheduler.stats["retries"] == 2
+
+
+def test_persistent_failure_raises_after_max_retries():
+    provider = FakeProvider(throttled_calls=100)
+    scheduler = _scheduler(provider, max_retries=2)
+
+    with pytest.raises(ValueError):
+        scheduler.download(["AAA"], period="1y")
+    assert scheduler.stats["requests"] == 3
+    assert scheduler.stats["failures"] == 1
+
+
+def test_missing_tickers_are_re_requested_then_reported():
+    provider = FakeProvider(missing={"ZZZ"})
+    scheduler = _scheduler(provider, max_retries=1)
+
+    df = scheduler.download(["AAA", "ZZZ"], period="1y")
+
+    assert list(df.columns) == ["AAA"]
+    assert provider.calls[0] == ["AAA", "ZZZ"] and provider.calls[1] == ["ZZZ"]
+    assert scheduler.stats["missing"] == 1
+
+
+def test_large_universes_are_split_into_balanced_batches():
+    provider = FakeProvider()
+    scheduler = _scheduler(provider, batch_size=50)
+
+    scheduler.download([f"T{i}" for i in range(51)], period="1y")
+
+    assert sorted(len(call) for call in provider.calls) == [25, 26]
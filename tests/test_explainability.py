@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from explainability import risk_attribution
+
+
+def _inputs():
+    tickers = ["AAA", "BBB", "CCC"]
+    covariance = pd.DataFrame([[0.04, 0.01, 0.0], [0.01, 0.09, 0.02], [0.0, 0.02, 0.16]], index=tickers, columns=tickers)
+    expected_returns = pd.Series([0.08, 0.10, 0.12], index=tickers)
+    return covariance, expected_returns
+
+
+def test_risk_contributions_add_up_to_volatility():
+    covariance, expected_returns = _inputs()
+    weights = pd.Series({"AAA": 0.5, "BBB": 0.5})  # Holdings are a subset of the optimizer's universe
+
+    table, summary = risk_attribution(weights, covariance, expected_returns)
+
+    w = np.array([0.5, 0.5])
+    assert np.isclose(summary["volatility"], np.sqrt(w @ covariance.iloc[:2, :2].to_numpy() @ w))
+    assert np.isclose(table["Risk Contribution"].sum(), summary["volatility"])
+    assert np.isclose(table["Risk Contribution (%)"].sum(), 100)
+
+
+def test_cache_matches_inputs_by_identity():
+    covariance, expected_returns = _inputs()
+    weights = pd.Series({"AAA": 0.3, "CCC": 0.7})
+
+    first, _ = risk_attribution(weights, covariance, expected_returns)
+    assert risk_attribution(weights, covariance, expected_returns)[0] is first
+    assert risk_attribution(weights, covariance * 2, expected_returns)[0] is not first
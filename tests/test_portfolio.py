@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+import pandas as pd
+import portfolio
+from portfolio import get_covariance
+
+
+def _synthetic_prices(n_days=120, tickers=("AAA", "BBB", "CCC"), seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=n_days)
+    log_returns = rng.normal(0.0005, 0.02, (n_days, len(tickers)))
+    return pd.DataFrame(100 * np.exp(np.cumsum(log_returns, axis=0)), index=dates, columns=list(tickers))
+
+
+def test_get_covariance_is_safe_across_threads_and_keeps_several_universes():
+    panels = [_synthetic_prices(seed=seed) for seed in range(4)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(get_covariance, panels * 25))
+
+    for prices, covariance in zip(panels * 25, results):
+        assert covariance.shape == (3, 3)
+        assert np.allclose(covariance, get_covariance(prices))
+    assert len(portfolio._COVARIANCE_CACHE) >= len(panels)
+    assert get_covariance(panels[0]) is get_covariance(panels[0])
+
+
+def test_resolve_allocation_method():
+    assert portfolio.resolve_allocation_method("High") == portfolio.ALLOCATION_METHODS["High"]
+    assert portfolio.resolve_allocation_method("Low", "hrp") == "hrp"
+    assert portfolio.resolve_allocation_method("Medium", {"Medium": "hrp", "Low": "mean_variance"}) == "hrp"
+    assert portfolio.resolve_allocation_method("High", {"Low": "hrp"}) == "mean_variance"
+    with pytest.raises(ValueError):
+        portfolio.resolve_allocation_method("Low", "black_litterman")
+
+
+def test_hrp_weights_are_long_only_and_favor_low_variance():
+    covariance = get_covariance(_synthetic_prices(seed=5))
+    covariance.loc["AAA", "AAA"] *= 9
+
+    weights = pd.Series(portfolio.hrp_weights(covariance))
+    assert weights.sum() == pytest.approx(1.0, abs=1e-4)
+    assert (weights >= 0).all()
+    assert weights["AAA"] == weights.min()
+
+
+def test_high_tier_falls_back_to_hrp_and_records_it(caplog):
+    # Every ticker loses money, so max_sharpe has no portfolio beating the risk-free rate
+    dates = pd.date_range("2021-01-01", periods=156, freq="W-FRI")
+    rng = np.random.default_rng(3)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(-0.004, 0.02, (156, 2)), axis=0)),
+                          index=dates, columns=["JPM", "GS"])
+
+    with caplog.at_level("WARNING", logger="portfolio"):
+        result = portfolio.generate_portfolio(10000, "High", ["Finance"], use_forecast=False, prices=prices)
+
+    assert set(result["Method"]) == {"hrp"}
+    assert result["Allocation"].sum() == pytest.approx(1.0, abs=1e-4)
+    assert "using HRP" in caplog.text
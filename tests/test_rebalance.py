@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import rebalance
+from rebalance import compute_drift, run_drift_job
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data, update_time=None):
+        self.id = doc_id
+        self._data = data
+        self.update_time = update_time
+
+    def to_dict(self):
+        return self._data
+
+
+class FakeQuery:
+    def __init__(self, docs, limit=None, after=None):
+        self.docs, self._limit, self._after = docs, limit, after
+
+    def order_by(self, field):
+        return FakeQuery(sorted(self.docs, key=lambda d: d.id), self._limit, self._after)
+
+    def limit(self, n):
+        return FakeQuery(self.docs, n, self._after)
+
+    def start_after(self, doc):
+        return FakeQuery(self.docs, self._limit, doc.id)
+
+    def stream(self):
+        docs = [d for d in self.docs if self._after is None or d.id > self._after]
+        return iter(docs[:self._limit])
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client, self.pending = client, []
+
+    def set(self, ref, data):
+        self.pending.append((ref, data))
+
+    def commit(self):
+        self.client.commits.append(len(self.pending))
+        for (collection, doc_id), data in self.pending:
+            self.client.written.setdefault(collection, {})[doc_id] = data
+
+
+class FakeCollection:
+    def __init__(self, client, name):
+        self.client, self.name = client, name
+
+    def __getattr__(self, attr):
+        return getattr(FakeQuery(self.client.collections.get(self.name, [])), attr)
+
+    def document(self, doc_id):
+        return (self.name, doc_id)
+
+
+class FakeFirestore:
+    """Local Firestore stand-in covering the paging and batched writes the drift job uses."""
+
+    def __init__(self, portfolios):
+        self.collections = {"portfolios": portfolios}
+        self.written, self.commits = {}, []
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def _saved(doc_id, allocations, investment, saved):
+    tickers = list(allocations)
+    portfolio = {
+        "Ticker": {str(i): t for i, t in enumerate(tickers)},
+        "Allocation": {str(i): allocations[t] for i, t in enumerate(tickers)},
+        "Investment ($)": {str(i): allocations[t] * investment for i, t in enumerate(tickers)}
+    }
+    return FakeDoc(doc_id, {"portfolio": portfolio}, pd.Timestamp(saved, tz="UTC"))
+
+
+def test_compute_drift_trades_out_of_band_holdings_back_to_target():
+    targets = np.array([[0.5, 0.5, 0.0]])
+    values = np.array([1000.0])
+    entry = np.array([[10.0, 10.0, 10.0]])
+    current = np.array([[20.0, 10.0, 10.0]])  # First holding doubles: 2/3 vs 1/3
+
+    weights, drift, trades, totals = compute_drift(targets, values, entry, current, tolerance=0.05)
+
+    np.testing.assert_allclose(weights, [[2 / 3, 1 / 3, 0.0]])
+    np.testing.assert_allclose(drift, [[1 / 6, -1 / 6, 0.0]])
+    np.testing.assert_allclose(totals, [1500.0])
+    np.testing.assert_allclose(trades, [[-250.0, 250.0, 0.0]])
+    assert np.isclose(trades.sum(), 0.0)
+
+
+def test_compute_drift_leaves_in_band_portfolios_alone():
+    targets = np.array([[0.5, 0.5]])
+    _, drift, trades, _ = compute_drift(targets, np.array([100.0]), np.array([[10.0, 10.0]]),
+                                        np.array([[10.2, 10.0]]), tolerance=0.05)
+    assert np.abs(drift).max() < 0.05
+    np.testing.assert_allclose(trades, 0.0)
+
+
+def test_drift_job_pages_through_portfolios_and_batches_writes(monkeypatch):
+    dates = pd.bdate_range("2024-01-01", periods=60)
+    prices = pd.DataFrame({"AAA": np.linspace(10, 20, 60), "BBB": np.full(60, 10.0)}, index=dates)
+    monkeypatch.setattr(rebalance, "fetch_stock_data", lambda *args, **kwargs: prices)
+    monkeypatch.setattr(rebalance, "WRITE_BATCH_SIZE", 3)
+
+    docs = [_saved(f"user{i:02d}", {"AAA": 0.5, "BBB": 0.5}, 1000.0, "2024-01-01") for i in range(7)]
+    docs.append(_saved("user99", {"AAA": 0.02, "BBB": 0.98}, 1000.0, "2024-03-20"))
+    client = FakeFirestore(docs)
+
+    summary = run_drift_job(client, universe=["AAA", "BBB"], page_size=3)
+
+    assert summary == {"portfolios": 8, "needs_rebalance": 7}
+    assert client.commits == [3, 3, 2]
+    results = client.written["portfolio_drift"]
+    assert results["user00"]["needs_rebalance"] and not results["user99"]["needs_rebalance"]
+    assert np.isclose(results["user00"]["weights"]["AAA"], 2 / 3)
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from risk import max_drawdown, rolling_volatility
+
+
+def test_first_bar_loss_counts_as_drawdown():
+    dates = pd.date_range("2024-01-05", periods=3, freq="W-FRI")
+    result = max_drawdown(pd.Series([-0.1, 0.05, 0.01], index=dates))
+
+    row = result.iloc[0]
+    assert np.isclose(row["Max Drawdown"], -0.1)
+    assert row["Trough"] == dates[0]
+    assert pd.isna(row["Recovery"])
+
+
+def test_drawdown_peak_trough_and_recovery():
+    dates = pd.date_range("2024-01-05", periods=5, freq="W-FRI")
+    returns = pd.Series([0.1, -0.2, 0.1, 0.2, 0.0], index=dates)
+    row = max_drawdown(returns).iloc[0]
+
+    assert np.isclose(row["Max Drawdown"], -0.2)
+    assert row["Peak"] == dates[0] and row["Trough"] == dates[1] and row["Recovery"] == dates[3]
+    assert row["Duration"] == 3
+
+
+def test_rolling_volatility_matches_pandas():
+    rng = np.random.default_rng(0)
+    returns = pd.DataFrame(rng.normal(0, 0.02, (200, 3)))
+    expected = returns.rolling(26).std() * np.sqrt(52)
+    np.testing.assert_allclose(rolling_volatility(returns, window=26), expected, rtol=1e-8, equal_nan=True)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from simulation import project_portfolio
+
+
+def _synthetic_prices(n_weeks=156, tickers=("AAA", "BBB", "CCC"), seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2021-01-01", periods=n_weeks, freq="W-FRI")
+    log_returns = rng.normal(0.002, 0.03, (n_weeks, len(tickers)))
+    return pd.DataFrame(100 * np.exp(np.cumsum(log_returns, axis=0)), index=dates, columns=list(tickers))
+
+
+def test_project_portfolio_end_to_end():
+    prices = _synthetic_prices()
+    portfolio = pd.DataFrame({
+        "Ticker": ["AAA", "BBB", "CCC"],
+        "Allocation": [0.5, 0.3, 0.2],
+        "Investment ($)": [5000.0, 3000.0, 2000.0]
+    })
+
+    projection = project_portfolio(portfolio, prices, horizon=26, n_paths=2000, chunk_size=500)
+
+    bands = projection["bands"]
+    assert list(bands.columns) == ["P5", "P25", "P50", "P75", "P95"]
+    assert len(bands) == 27
+    assert np.allclose(bands.iloc[0], 10000.0)
+    assert (bands.iloc[-1].diff().dropna() >= 0).all()
+    assert 0.0 <= projection["prob_loss_final"] <= 1.0
+    assert projection["expected_value"] > 0
+
+
+def test_project_portfolio_reuses_cached_moments():
+    prices = _synthetic_prices(seed=1)
+    portfolio = pd.DataFrame({"Ticker": ["AAA", "BBB"], "Allocation": [0.6, 0.4], "Investment ($)": [600.0, 400.0]})
+
+    first = project_portfolio(portfolio, prices, horizon=4, n_paths=500)
+    second = project_portfolio(portfolio, prices, horizon=4, n_paths=500)
+    pd.testing.assert_frame_equal(first["bands"], second["bands"])
+
+
+def test_estimate_return_moments_is_safe_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    from simulation import estimate_return_moments
+
+    panels = [_synthetic_prices(n_weeks=30, seed=seed) for seed in range(4)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(estimate_return_moments, panels * 25))
+
+    for prices, (mean, covariance) in zip(panels * 25, results):
+        log_returns = np.log(prices.astype(np.float32)).diff().iloc[1:]
+        assert np.allclose(mean, log_returns.mean(), atol=1e-5)
+        assert covariance.shape == (3, 3)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from snapshots import SnapshotStore
+
+
+def _prices(n, seed):
+    dates = pd.bdate_range("2020-01-01", periods=n)
+    return pd.DataFrame(np.random.default_rng(seed).random((n, 2)), index=dates, columns=["AAA", "BBB"])
+
+
+def test_versions_are_bounded_and_numbered_monotonically():
+    store = SnapshotStore(max_versions=2)
+    numbers = [store.commit(_prices(50 + i, i)) for i in range(4)]
+
+    assert numbers == [0, 1, 2, 3]
+    assert len(store.versions) == 2
+    assert len(store.as_of("2030-01-01", version=2)) == 52
+    with pytest.raises(KeyError):
+        store.as_of("2030-01-01", version=0)
+
+
+def test_unchanged_commit_reuses_latest_version():
+    store = SnapshotStore()
+    prices = _prices(30, 0)
+    assert store.commit(prices) == store.commit(prices.copy()) == 0
+
+
+def test_as_of_view_shares_the_version_arrays():
+    store = SnapshotStore()
+    store.commit(_prices(100, 0))
+    view = store.as_of("2020-02-01")
+    assert view.dates[-1] <= pd.Timestamp("2020-02-01")
+    assert np.shares_memory(view.values, store.versions[-1]["panel"].values)
+
+
+def test_saved_versions_survive_a_restart(tmp_path):
+    store = SnapshotStore(max_versions=1, path=str(tmp_path))
+    first, second = _prices(40, 0), _prices(45, 1)
+    assert store.commit(first) == 0
+    assert store.commit(second) == 1
+
+    reopened = SnapshotStore(max_versions=1, path=str(tmp_path))
+    assert reopened.latest_version == 1
+    assert np.array_equal(reopened.as_of("2030-01-01", version=0).values, first.to_numpy(dtype=np.float32))
+    assert reopened.as_of("2030-01-01").dates.equals(second.index)
+    assert reopened.commit(_prices(50, 2)) == 2
+
+
+def test_load_snapshot_reuses_the_committed_version(monkeypatch):
+    import db
+    import snapshots
+
+    downloads = []
+
+    def fake_fetch(tickers, start, end=None, interval="1wk"):
+        downloads.append(tickers)
+        return _prices(30, len(downloads))
+
+    monkeypatch.setattr(db, "fetch_stock_data", fake_fetch)
+    monkeypatch.setattr(snapshots, "_STORES", snapshots.OrderedDict())
+
+    store = snapshots.load_snapshot(["AAA", "BBB"], start="2020-01-01")
+    assert snapshots.load_snapshot(["BBB", "AAA"], start="2020-01-01").latest_version == store.latest_version == 0
+    assert len(downloads) == 1
+
+    assert snapshots.load_snapshot(["AAA", "BBB"], start="2020-01-01", refresh=True).latest_version == 1
+    assert len(downloads) == 2
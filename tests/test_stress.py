@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+import stress
+from panel import PricePanel
+from stress import factor_betas, historical_stress, run_stress_job
+from test_rebalance import FakeFirestore, _saved
+
+DATES = pd.bdate_range("2020-01-01", periods=7)
+SCENARIO = {"Shock": (str(DATES[1].date()), str(DATES[3].date()))}
+
+
+def _panel():
+    # AAA falls 40% over the window and recovers two bars after the trough; BBB is unpriced at the start
+    prices = pd.DataFrame({
+        "AAA": [100, 100, 80, 60, 90, 100, 110],
+        "BBB": [np.nan, np.nan, 50, 50, 50, 50, 50]
+    }, index=DATES, dtype=float)
+    return PricePanel.from_frame(prices)
+
+
+def test_historical_stress_loss_drawdown_recovery_and_coverage():
+    weights = pd.Series({"AAA": 0.5, "BBB": 0.5})
+    row = historical_stress(_panel(), weights, SCENARIO).loc[("Portfolio", "Shock")]
+
+    # Unpriced BBB counts as cash: wealth 1 -> 0.9 -> 0.7875, then 0.984 and 1.039
+    assert row["Loss"] == pytest.approx(0.2125, abs=1e-6)
+    assert row["Max Drawdown"] == pytest.approx(-0.2125, abs=1e-6)
+    assert row["Trough"] == DATES[3]
+    assert row["Recovery"] == DATES[5]
+    assert row["Recovery (periods)"] == 2
+    assert row["Coverage"] == pytest.approx(0.5)
+
+
+def test_historical_stress_marks_unrecovered_portfolios():
+    prices = pd.DataFrame({"AAA": [100, 100, 80, 60, 70, 75, 80]}, index=DATES, dtype=float)
+    row = historical_stress(PricePanel.from_frame(prices), pd.Series({"AAA": 1.0}), SCENARIO).iloc[0]
+    assert pd.isna(row["Recovery"]) and np.isnan(row["Recovery (periods)"])
+
+
+def test_factor_betas_recover_a_known_beta():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2020-01-01", periods=201)
+    factor = rng.normal(0, 0.01, 200)
+    stock = 0.0005 + 1.5 * factor + rng.normal(0, 0.001, 200)
+
+    def levels(returns):
+        return 100 * np.concatenate([[1.0], np.cumprod(1 + returns)])
+
+    panel = PricePanel.from_frame(pd.DataFrame({"AAA": levels(stock), "NEW": np.r_[[np.nan] * 180, levels(stock)[180:]]},
+                                               index=dates))
+    factor_panel = PricePanel.from_frame(pd.DataFrame({"Market": levels(factor)}, index=dates))
+
+    betas = factor_betas(panel, factor_panel)
+    assert betas.loc["AAA", "Market"] == pytest.approx(1.5, abs=0.02)
+    assert np.isnan(betas.loc["NEW", "Market"])  # Fewer than MIN_BETA_OBSERVATIONS bars
+
+
+def test_run_stress_job_stresses_every_saved_portfolio(monkeypatch):
+    monkeypatch.setattr(stress, "fetch_stress_panels", lambda tickers, interval="1d": (_panel(), PricePanel.from_frame(pd.DataFrame())))
+    client = FakeFirestore([
+        _saved("p1", {"AAA": 0.5, "BBB": 0.5}, 1000, "2020-01-01"),
+        _saved("p2", {"AAA": 1.0}, 1000, "2020-01-01"),
+        _saved("p3", {"BBB": 1.0}, 1000, "2020-01-01")
+    ])
+
+    results = run_stress_job(client, universe=["AAA", "BBB"], page_size=2, scenarios=SCENARIO)
+
+    assert list(results.index.get_level_values("Portfolio")) == ["p1", "p2", "p3"]
+    assert results.loc[("p1", "Shock"), "Loss"] == pytest.approx(0.2125, abs=1e-6)
+    assert results.loc[("p2", "Shock"), "Loss"] == pytest.approx(0.4, abs=1e-6)
+    assert results.loc[("p3", "Shock"), "Coverage"] == 0
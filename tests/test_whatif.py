@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pypfopt.efficient_frontier import EfficientFrontier
+from whatif import FrontierWhatIf
+
+
+def _inputs(n=6, seed=0):
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i}" for i in range(n)]
+    factors = rng.normal(0, 0.2, (n, n))
+    covariance = pd.DataFrame(factors @ factors.T / n + 0.01 * np.eye(n), index=tickers, columns=tickers)
+    expected_returns = pd.Series(rng.uniform(0.03, 0.25, n), index=tickers)
+    return expected_returns, covariance
+
+
+def test_successive_solves_match_a_cold_efficient_frontier():
+    expected_returns, covariance = _inputs()
+    whatif = FrontierWhatIf(expected_returns, covariance)
+
+    for target in (0.08, 0.15, 0.10, 0.20, 0.12):
+        weights = whatif.solve_return(target)
+        cold = EfficientFrontier(expected_returns, covariance).efficient_return(target_return=target)
+        cold = pd.Series(cold)[weights.index]
+        assert np.allclose(weights, cold, atol=1e-3)
+        assert whatif.solved_target == target
+
+
+def test_unattainable_target_is_clamped_and_reported():
+    expected_returns, covariance = _inputs()
+    whatif = FrontierWhatIf(expected_returns, covariance)
+
+    weights = whatif.solve_return(1.0)
+    assert whatif.solved_target == pytest.approx(expected_returns.max() - 1e-4)
+    assert weights.idxmax() == expected_returns.idxmax()
+
+
+def test_infeasible_problem_raises_a_clear_error():
+    expected_returns, covariance = _inputs(n=3)
+    whatif = FrontierWhatIf(expected_returns, covariance, weight_bounds=(0, 0.2))
+
+    with pytest.raises(ValueError, match="solver status"):
+        whatif.solve_return(0.05)
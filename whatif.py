@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import cvxpy as cp
+
+
+class FrontierWhatIf:
+    """Efficient-frontier re-solves for interactive target-return / risk sliders.
+
+    The problems are built once per universe with the target as a cvxpy Parameter, so moving
+    a slider only updates a constraint bound. cvxpy reuses the canonicalized problem and OSQP
+    keeps its KKT factorization, warm-starting each solve from the previous solution.
+    """
+
+    def __init__(self, expected_returns, covariance, weight_bounds=(0, 1)):
+        self.tickers = list(expected_returns.index)
+        self.mu = expected_returns.to_numpy(dtype=float)
+        self.cov = covariance.reindex(index=self.tickers, columns=self.tickers).to_numpy(dtype=float)
+        chol = np.linalg.cholesky(self.cov + 1e-10 * np.eye(len(self.tickers)))
+
+        self.weights = cp.Variable(len(self.tickers))
+        self.target_return = cp.Parameter()
+        self.target_volatility = cp.Parameter(nonneg=True)
+
+        base = [cp.sum(self.weights) == 1, self.weights >= weight_bounds[0], self.weights <= weight_bounds[1]]
+        risk = cp.sum_squares(chol.T @ self.weights)
+
+        # Min variance for a target return (a QP: OSQP with warm start)
+        self._return_problem = cp.Problem(cp.Minimize(risk), base + [self.mu @ self.weights >= self.target_return])
+        # Max return for a volatility budget (an SOCP: parameter-only updates skip recompilation)
+        self._risk_problem = cp.Problem(
+            cp.Maximize(self.mu @ self.weights),
+            base + [cp.norm(chol.T @ self.weights, 2) <= self.target_volatility]
+        )
+
+        self.min_volatility = None
+        self.max_return = float(self.mu.max()) if weight_bounds[1] >= 1 else None
+        self.solved_target = None  # Target the last solve_return actually used (after clamping)
+
+    def _result(self, problem):
+        if problem.status not in (cp.OPTIMAL, cp.OPTIMAL_INACCURATE) or self.weights.value is None:
+            raise ValueError(f"What-if optimization did not find a portfolio (solver status: {problem.status}).")
+        w = np.clip(self.weights.value, 0, None)
+        return pd.Series(w / w.sum(), index=self.tickers).round(5)
+
+    def solve_return(self, target_return):
+        """Minimum-volatility weights reaching ``target_return`` (clamped to the attainable range, see ``solved_target``)."""
+        if self.max_return is not None:
+            target_return = min(target_return, self.max_return - 1e-4)
+        self.solved_target = target_return
+        self.target_return.value = target_return
+        self._return_problem.solve(solver=cp.OSQP, warm_start=True, eps_abs=1e-7, eps_rel=1e-7)
+        return self._result(self._return_problem)
+
+    def solve_volatility(self, target_volatility):
+        """Maximum-return weights within ``target_volatility`` (raised to the minimum attainable volatility)."""
+        if self.min_volatility is None:
+            # Any target below the lowest expected return leaves the return constraint slack
+            self.solve_return(float(self.mu.min()) - 1)
+            self.min_volatility = float(np.sqrt(self._return_problem.value))
+        self.target_volatility.value = max(target_volatility, self.min_volatility * (1 + 1e-6))
+        self._risk_problem.solve(warm_start=True)
+        return self._result(self._risk_problem)
+
+    def performance(self, weights):
+        """Expected return and volatility of a weight vector from this universe."""
+        w = weights.reindex(self.tickers).fillna(0).to_numpy()
+        return float(self.mu @ w), float(np.sqrt(w @ self.cov @ w))